@@ -1,37 +1,23 @@
 from fastapi import FastAPI, UploadFile, File
-from app.classifier import SpeciesClassifier
-from app.detectron import load_predictor
+from app.registry import registry
 from app.utils import (
     read_image,
     preprocess_classifier,
     save_annotated_image,
     log_prediction
 )
-import torch
-import yaml
 import numpy as np
-import os
 
 app = FastAPI(title="API Fígado Canino/Felino")
 
 # ======================
-# LOAD CONFIG
+# LOAD MODELS (registro compartilhado, uma vez só)
 # ======================
-with open("configs/app.yaml") as f:
-    CFG = yaml.safe_load(f)
+classifier = registry.get_classifier()
 
-# ======================
-# LOAD MODELS (uma vez só)
-# ======================
-classifier = SpeciesClassifier(
-    CFG["classifier"]["model"],
-    threshold=0.7
-)
-
-# Apenas passamos a espécie; load_predictor já monta os caminhos
 predictors = {
-    "canino": load_predictor("canino")[0],  # [0] pega o DefaultPredictor
-    "felino": load_predictor("felino")[0]
+    "canino": registry.get_predictor("canino"),
+    "felino": registry.get_predictor("felino")
 }
 
 VALID_LIVER_CLASSES = {
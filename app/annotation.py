@@ -0,0 +1,206 @@
+import asyncio
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import CFG
+from app.outputs import decode_stored, get_store
+from app.utils import save_annotated_image
+
+# Estados da imagem anotada
+PENDENTE = "pendente"
+PRONTA = "pronta"
+ERRO = "erro"
+SOB_DEMANDA = "sob_demanda"
+
+
+def _scale_boxes(instances, scale):
+    """
+    Cópia de `instances` com as caixas divididas por (sx, sy), sem alterar
+    as detecções da resposta.
+    """
+    sx, sy = scale
+    boxes = instances.pred_boxes
+    scaled = type(boxes)(boxes.tensor / boxes.tensor.new_tensor([sx, sy, sx, sy]))
+    return type(instances)(instances.image_size, **{**instances.get_fields(), "pred_boxes": scaled})
+
+
+class AnnotationWriter:
+    """
+    Renderiza e grava as imagens anotadas num pool próprio, fora do
+    caminho crítico da requisição.
+
+    Cada imagem recebe um id estável; o caminho do arquivo é conhecido
+    antes da gravação e o estado (pendente/pronta/erro) pode ser consultado.
+    """
+
+    def __init__(self, output_dir="outputs", workers=1, max_tracked=10000):
+        self.output_dir = output_dir
+        self.max_tracked = max_tracked
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="annotation")
+        self._status = OrderedDict()  # id -> (estado, caminho)
+        self._lock = threading.Lock()
+
+    def _path(self, output_id, especie):
+        return os.path.join(self.output_dir, especie, f"resultado_{output_id}.jpg")
+
+    def _set_status(self, output_id, status, path):
+        with self._lock:
+            self._status[output_id] = (status, path)
+            self._status.move_to_end(output_id)
+            while len(self._status) > self.max_tracked:
+                self._status.popitem(last=False)
+
+    def _write(self, output_id, image, instances, especie, class_names):
+        path = self._path(output_id, especie)
+        try:
+            # bytes originais: decodifica para anotar (limitado a ingestion.max_pixels)
+            if isinstance(image, bytes):
+                image, scale = decode_stored(image)
+                if scale != (1.0, 1.0):
+                    instances = _scale_boxes(instances, scale)
+            save_annotated_image(
+                image=image,
+                instances=instances,
+                especie=especie,
+                class_names=class_names,
+                output_dir=self.output_dir,
+                filename=os.path.basename(path)
+            )
+        except Exception:
+            self._set_status(output_id, ERRO, path)
+            raise
+        self._set_status(output_id, PRONTA, path)
+        return path
+
+    async def write(self, output_id, image, instances, especie, class_names):
+        """
+        Grava a imagem anotada e aguarda o término (modo "sync").
+
+        Returns:
+            str: caminho da imagem
+        """
+        future = self._pool.submit(self._write, output_id, image, instances, especie, class_names)
+        return await asyncio.wrap_future(future)
+
+    def submit(self, output_id, image, instances, especie, class_names):
+        """
+        Agenda a gravação no pool e retorna imediatamente (modo "async").
+
+        Returns:
+            str: caminho onde a imagem estará quando pronta
+        """
+        path = self._path(output_id, especie)
+        self._set_status(output_id, PENDENTE, path)
+        self._pool.submit(self._write, output_id, image, instances, especie, class_names)
+        return path
+
+    async def store(self, output_id, data: bytes, especie, detections):
+        """
+        Guarda a imagem original e as detecções para renderização sob demanda.
+
+        Roda no threadpool da aplicação, não no pool de renderização: a
+        resposta não espera os JPEGs anotados de outras requisições.
+        """
+        await run_in_threadpool(get_store().save, output_id, data, especie, detections)
+
+    def status(self, output_id):
+        with self._lock:
+            entry = self._status.get(output_id)
+        if entry is None:
+            return None
+        status, path = entry
+        return {"id": output_id, "status": status, "imagem_anotada": path}
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_writer = None
+
+
+def get_writer():
+    """
+    Retorna o AnnotationWriter compartilhado pelos endpoints.
+    """
+    global _writer
+    if _writer is None:
+        cfg = CFG.get("annotation", {})
+        _writer = AnnotationWriter(
+            output_dir=cfg.get("output_dir", "outputs"),
+            workers=cfg.get("workers", 1)
+        )
+    return _writer
+
+
+def default_mode():
+    return CFG.get("annotation", {}).get("mode", "lazy")
+
+
+async def annotate_prediction(
+    annotate, data, image, instances, especie, detections, class_names, scale=(1.0, 1.0)
+):
+    """
+    Trata a imagem anotada de uma predição conforme o modo pedido.
+
+    - none: nada é guardado
+    - lazy: guarda original + detecções; a imagem é renderizada em GET /outputs/{id}
+    - async: como lazy, e grava o JPEG anotado em segundo plano
+    - sync: como lazy, e grava o JPEG anotado antes de responder
+
+    Se a imagem foi decodificada em resolução reduzida (`scale` != 1), o
+    JPEG anotado é desenhado a partir dos bytes originais, já que as
+    detecções estão nas coordenadas da imagem original.
+
+    Returns:
+        tuple: (caminho do JPEG anotado ou None, dict "anotacao" ou None)
+    """
+    if annotate == "none":
+        return None, None
+
+    if scale != (1.0, 1.0):
+        image = data
+
+    writer = get_writer()
+    output_id = uuid.uuid4().hex
+    await writer.store(output_id, data, especie, detections)
+
+    image_path, status = None, SOB_DEMANDA
+    if annotate == "sync":
+        image_path = await writer.write(output_id, image, instances, especie, class_names)
+        status = PRONTA
+    elif annotate == "async":
+        image_path = writer.submit(output_id, image, instances, especie, class_names)
+        status = PENDENTE
+
+    return image_path, {"id": output_id, "status": status, "url": f"/outputs/{output_id}"}
+
+
+def refresh_annotation(result):
+    """
+    Atualiza o estado da imagem anotada de um resultado vindo do cache:
+    o cache guarda a resposta como foi produzida, e uma anotação "async"
+    ainda pendente naquele momento pode já estar pronta (ou ter falhado).
+
+    Returns:
+        dict: o próprio resultado, ou uma cópia com `anotacao.status` atual
+    """
+    anotacao = result.get("anotacao")
+    if not anotacao or anotacao.get("status") != PENDENTE:
+        return result
+
+    current = get_writer().status(anotacao["id"])
+    if current is not None:
+        status = current["status"]
+    elif result.get("imagem_anotada") and os.path.isfile(result["imagem_anotada"]):
+        status = PRONTA  # já saiu do registro de estados, mas o arquivo foi gravado
+    else:
+        return result
+
+    if status == PENDENTE:
+        return result
+    return {**result, "anotacao": {**anotacao, "status": status}}
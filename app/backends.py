@@ -0,0 +1,116 @@
+import os
+
+import torch
+
+BACKENDS = ("eager", "torchscript", "onnx", "int8")
+
+EXPORT_EXTENSIONS = {"torchscript": ".ts", "onnx": ".onnx", "int8": ".int8.pth"}
+
+
+def exported_path(weights_path: str, backend: str):
+    """
+    Caminho do modelo exportado a partir do caminho dos pesos eager
+    (ex.: model_final_canino.pth -> model_final_canino.onnx).
+    """
+    if backend == "eager":
+        return weights_path
+    if backend not in EXPORT_EXTENSIONS:
+        raise ValueError(f"Backend inválido: '{backend}' (use {', '.join(BACKENDS)})")
+    return os.path.splitext(weights_path)[0] + EXPORT_EXTENSIONS[backend]
+
+
+def mmap_path(weights_path: str):
+    """
+    Pesos convertidos para carregamento via mmap (scripts/convert_weights_mmap.py).
+    """
+    return os.path.splitext(weights_path)[0] + ".mmap.pt"
+
+
+class OnnxModule:
+    """
+    Sessão do ONNX Runtime (CPU) com a mesma chamada de um nn.Module:
+    recebe e devolve tensores do torch.
+    """
+
+    def __init__(self, path: str, threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        self.input_names = [i.name for i in self.session.get_inputs()]
+        self.nbytes = os.path.getsize(path)
+
+    def __call__(self, *tensors):
+        feeds = {
+            name: t.detach().cpu().numpy()
+            for name, t in zip(self.input_names, tensors)
+        }
+        outputs = [torch.from_numpy(o) for o in self.session.run(None, feeds)]
+        return outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+    def eval(self):
+        return self
+
+
+def load_module(path: str, backend: str):
+    """
+    Carrega um modelo exportado (TorchScript ou ONNX).
+    """
+    if not os.path.isfile(path):
+        raise FileNotFoundError(f"Modelo exportado '{path}' não encontrado! Rode scripts/export_models.py")
+    if backend == "torchscript":
+        return torch.jit.load(path, map_location="cpu").eval()
+    if backend == "onnx":
+        return OnnxModule(path)
+    raise ValueError(f"Backend inválido: '{backend}' (use {', '.join(BACKENDS)})")
+
+
+class ExportedPredictor:
+    """
+    Predictor do Detectron2 sobre um modelo exportado (TorchScript/ONNX).
+
+    Expõe a mesma interface do DefaultPredictor usada na API
+    (`cfg`, `aug`, `input_format`, `model(inputs)` e `__call__`).
+    O grafo exportado recebe uma imagem CHW já redimensionada e devolve
+    (pred_boxes, pred_classes, scores, image_size), na ordem do
+    `TracingAdapter` do detectron2.
+    """
+
+    def __init__(self, cfg, path: str, backend: str):
+        import detectron2.data.transforms as T
+
+        self.cfg = cfg.clone()
+        self.backend = backend
+        self.input_format = cfg.INPUT.FORMAT
+        self.aug = T.ResizeShortestEdge(
+            [cfg.INPUT.MIN_SIZE_TEST, cfg.INPUT.MIN_SIZE_TEST], cfg.INPUT.MAX_SIZE_TEST
+        )
+        self.graph = load_module(path, backend)
+
+    def model(self, inputs):
+        from detectron2.modeling.postprocessing import detector_postprocess
+        from detectron2.structures import Boxes, Instances
+
+        outputs = []
+        for inp in inputs:
+            image = inp["image"]
+            with torch.no_grad():
+                boxes, classes, scores = self.graph(image)[:3]
+
+            instances = Instances(
+                tuple(image.shape[1:]),
+                pred_boxes=Boxes(boxes),
+                pred_classes=classes,
+                scores=scores
+            )
+            outputs.append({
+                "instances": detector_postprocess(instances, inp["height"], inp["width"])
+            })
+        return outputs
+
+    def __call__(self, original_image):
+        from app.detectron import predict_batch
+        return predict_batch(self, [original_image])[0]
@@ -0,0 +1,197 @@
+import asyncio
+import time
+from functools import partial
+
+from app.config import CFG
+from app.detectron import predict_batch
+from app.executor import DeadlineExceeded, current_deadline, get_executor, remaining, set_deadline
+from app.metrics import Histogram, render_histograms
+from app.profiling import ENABLED as PROFILING_ENABLED, current_session
+from app.registry import registry
+from app.workers import from_compact, to_compact
+
+BATCH_SIZE_BUCKETS = [1, 2, 3, 4, 6, 8, 12, 16, 32]
+QUEUE_WAIT_BUCKETS = [0.001, 0.002, 0.005, 0.01, 0.015, 0.025, 0.05, 0.1, 0.25]
+
+
+def detect_batch(species: str, images, tier: str = None):
+    """
+    Roda o Detectron2 da espécie (no tier pedido) em um lote de imagens (uma chamada ao modelo).
+
+    Função de módulo para poder ser enviada ao executor também no modo "process".
+
+    Returns:
+        list[Instances]: detecções de cada imagem, já na CPU
+    """
+    predictor = registry.get_predictor(species, tier)
+    return [out["instances"].to("cpu") for out in predict_batch(predictor, images)]
+
+
+def detect_batch_compact(images, species: str, tier: str = None):
+    """
+    `detect_batch` para os workers do modo "process": devolve só os
+    arrays das detecções (ver `app.workers.to_compact`).
+    """
+    return [to_compact(instances) for instances in detect_batch(species, images, tier)]
+
+
+async def run_detection(species: str, images, tier: str = None):
+    """
+    Roda um lote no executor. No modo "process" as imagens vão por memória
+    compartilhada e as detecções voltam como arrays compactos.
+    """
+    executor = get_executor()
+    if executor.mode == "process":
+        compact = await executor.run_images(detect_batch_compact, images, species, tier)
+        return [from_compact(c) for c in compact]
+    return await executor.run(detect_batch, species, images, tier)
+
+
+class MicroBatcher:
+    """
+    Agrupa requisições concorrentes em lotes dinâmicos.
+
+    Um lote é disparado quando atinge `max_batch_size` itens ou quando o
+    item mais antigo espera `max_wait_ms`. O lote roda no executor de
+    inferência (`run_batch` é uma corrotina que recebe a lista de itens)
+    e cada chamador recebe apenas o seu resultado.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=15, executor=None):
+        self.run_batch = run_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.executor = executor or get_executor()
+
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_wait = Histogram(QUEUE_WAIT_BUCKETS)
+
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        """
+        Enfileira um item e aguarda o resultado do lote em que ele for executado.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter(), current_deadline()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        now = time.perf_counter()
+        for _, _, enqueued, _ in batch:
+            self.queue_wait.observe(now - enqueued)
+
+        # ---- descarta itens cancelados (cliente desistiu) ou com prazo vencido
+        live = []
+        for entry in batch:
+            future, deadline = entry[1], entry[3]
+            if future.done():
+                continue
+            left = remaining(deadline) if deadline is not None else None
+            if left is not None and left <= 0:
+                self.executor.expired += 1
+                future.set_exception(DeadlineExceeded())
+                continue
+            live.append(entry)
+
+        if not live:
+            return
+        self.batch_sizes.observe(len(live))
+
+        # o lote vale enquanto algum item ainda estiver no prazo
+        deadlines = [entry[3] for entry in live]
+        set_deadline(None if None in deadlines else max(deadlines) - time.monotonic())
+
+        try:
+            results = await self.run_batch([item for item, _, _, _ in live])
+        except Exception as exc:
+            for _, future, _, _ in live:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future, _, _), result in zip(live, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": len(self._pending),
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_wait_seconds": self.queue_wait.snapshot()
+        }
+
+
+_batchers = {}
+
+
+def get_batcher(species: str, tier: str = None):
+    """
+    Retorna o MicroBatcher da espécie e tier (um por par, compartilhado pelos endpoints).
+    """
+    key = (species, tier)
+    if key not in _batchers:
+        cfg = CFG.get("batching", {})
+        _batchers[key] = MicroBatcher(
+            partial(run_detection, species, tier=tier),
+            max_batch_size=cfg.get("max_batch_size", 8),
+            max_wait_ms=cfg.get("max_wait_ms", 15)
+        )
+    return _batchers[key]
+
+
+def _batcher_name(key):
+    species, tier = key
+    return species if tier is None else f"{species}/{tier}"
+
+
+async def detect(species: str, image_array, tier: str = None):
+    """
+    Detecção de uma imagem, passando pelo micro-batching quando habilitado.
+    """
+    # requisições perfiladas não entram em lotes de outras requisições
+    profiled = PROFILING_ENABLED and current_session() is not None
+
+    if CFG.get("batching", {}).get("enabled", False) and not profiled:
+        return await get_batcher(species, tier).submit(image_array)
+
+    results = await run_detection(species, [image_array], tier)
+    return results[0]
+
+
+def batching_stats():
+    return {_batcher_name(key): batcher.stats() for key, batcher in _batchers.items()}
+
+
+def render_batching_metrics():
+    series = [({"especie": species, "tier": tier or "base"}, b) for (species, tier), b in _batchers.items()]
+    return render_histograms(
+        "liver_api_batch_size", "Imagens por chamada ao Detectron2",
+        [(labels, b.batch_sizes) for labels, b in series]
+    ) + render_histograms(
+        "liver_api_batch_queue_wait_seconds", "Espera na fila do micro-batching",
+        [(labels, b.queue_wait) for labels, b in series]
+    )
@@ -0,0 +1,163 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from app.config import CFG
+
+
+class ResultCache:
+    """
+    Cache de resultados endereçado por conteúdo.
+
+    A chave é o SHA-256 dos bytes enviados junto com as versões dos
+    modelos e thresholds (ver `make_key`). Há um nível em memória (LRU,
+    limitado pelo tamanho em bytes dos resultados) e um nível opcional em
+    disco que sobrevive a reinícios. Requisições idênticas concorrentes
+    compartilham uma única computação em andamento (single-flight).
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+
+        self._entries = OrderedDict()  # chave -> (resultado, tamanho)
+        self._size = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.shared = 0
+
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(data: bytes, *parts):
+        h = hashlib.sha256()
+        for part in parts:
+            h.update(str(part).encode())
+            h.update(b"\0")
+        h.update(data)
+        return h.hexdigest()
+
+    # ---- nível em disco
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def _disk_get(self, key):
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key, encoded):
+        path = self._disk_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(encoded)
+        os.replace(tmp, path)
+
+    # ---- nível em memória
+    def _memory_get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def _memory_put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = (value, size)
+            self._size += size
+            while self._size > self.max_bytes:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._size -= evicted
+
+    async def get(self, key):
+        value = self._memory_get(key)
+        if value is None and self.disk_dir:
+            value = await asyncio.to_thread(self._disk_get, key)
+            if value is not None:
+                self._memory_put(key, value, len(json.dumps(value, ensure_ascii=False)))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def put(self, key, value):
+        encoded = json.dumps(value, ensure_ascii=False)
+        self._memory_put(key, value, len(encoded))
+        if self.disk_dir:
+            await asyncio.to_thread(self._disk_put, key, encoded)
+
+    async def _compute_and_put(self, key, compute):
+        value = await compute()
+        await self.put(key, value)
+        return value
+
+    async def get_or_compute(self, key, compute):
+        """
+        Retorna o resultado em cache ou executa `compute()` (corrotina)
+        uma única vez, mesmo com chamadas concorrentes para a mesma chave.
+
+        A computação roda numa tarefa própria: se quem a iniciou for
+        cancelado (ex.: cliente desconectou), as demais chamadas ainda
+        recebem o resultado.
+        """
+        value = await self.get(key)
+        if value is not None:
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.shared += 1
+        else:
+            task = asyncio.ensure_future(self._compute_and_put(key, compute))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            # evita aviso de exceção não recuperada quando ninguém mais espera
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "disk_dir": self.disk_dir,
+            "hits": self.hits,
+            "misses": self.misses,
+            "shared_inflight": self.shared
+        }
+
+
+_cache = None
+
+
+def get_cache():
+    """
+    Retorna o cache compartilhado, ou None se desabilitado em configs/app.yaml.
+    """
+    global _cache
+    cfg = CFG.get("cache", {})
+    if not cfg.get("enabled", False):
+        return None
+    if _cache is None:
+        _cache = ResultCache(
+            max_bytes=cfg.get("max_bytes", 64 * 1024 * 1024),
+            disk_dir=cfg.get("disk_dir")
+        )
+    return _cache
@@ -1,9 +1,17 @@
 import os
+import numpy as np
 import torch
 import torch.nn as nn
-import torchvision.transforms as T
+import torchvision.transforms.functional as F
 from PIL import Image
 
+from app.backends import exported_path, load_module, mmap_path
+from app.quantization import check_approved
+
+
+# Classes do SimpleCNN, na ordem das saídas
+SPECIES = ("canino", "felino")
+
 
 class SimpleCNN(nn.Module):
     def __init__(self):
@@ -29,43 +37,108 @@ class SimpleCNN(nn.Module):
 
 
 class SpeciesClassifier:
-    def __init__(self, model_path: str, threshold=0.7):
+    def __init__(self, model_path: str, threshold=0.7, backend="eager", mmap=False):
         self.threshold = threshold
+        self.backend = backend
 
         base_dir = os.path.dirname(
             os.path.dirname(os.path.abspath(__file__))
         )
         full_model_path = os.path.join(base_dir, model_path)
 
-        if not os.path.exists(full_model_path):
-            raise FileNotFoundError(f"Modelo não encontrado: {full_model_path}")
-
         self.device = "cpu"
 
-        self.model = torch.load(
-          full_model_path,
-          map_location=self.device,
-          weights_only=False
-        )
+        if backend in ("eager", "int8"):
+            if backend == "int8":
+                # SimpleCNN quantizado por scripts/quantize_models.py
+                full_model_path = exported_path(full_model_path, backend)
+                check_approved(full_model_path)
+            elif mmap:
+                # pesos mapeados em memória (scripts/convert_weights_mmap.py)
+                full_model_path = mmap_path(full_model_path)
+
+            if not os.path.exists(full_model_path):
+                raise FileNotFoundError(f"Modelo não encontrado: {full_model_path}")
+
+            self.model = torch.load(
+              full_model_path,
+              map_location=self.device,
+              weights_only=False,
+              mmap=mmap and backend == "eager"
+            )
+        else:
+            # TorchScript / ONNX exportados por scripts/export_models.py
+            self.model = load_module(exported_path(full_model_path, backend), backend)
 
         self.model.eval()
 
-        self.transform = T.Compose([
-            T.Resize((224, 224)),
-            T.ToTensor()
-        ])
-
-    def predict(self, image: Image.Image):
-        x = self.transform(image).unsqueeze(0).to(self.device)
+        self.input_size = (224, 224)
+
+    def _resize(self, batch: torch.Tensor):
+        if tuple(batch.shape[-2:]) != self.input_size:
+            batch = F.resize(batch, list(self.input_size), antialias=True)
+        return batch
+
+    def _to_batch(self, images, channel_order="RGB"):
+        """
+        Converte a entrada em um tensor Nx3x224x224 float em [0, 1] (RGB).
+        """
+        if isinstance(images, torch.Tensor):
+            batch = images if images.dim() == 4 else images.unsqueeze(0)
+            batch = self._resize(batch)
+        else:
+            tensors = []
+            for image in images:
+                if isinstance(image, torch.Tensor):
+                    x = image
+                else:
+                    if image.mode != "RGB":
+                        image = image.convert("RGB")
+                    x = torch.from_numpy(np.array(image, dtype=np.uint8)).permute(2, 0, 1)
+                tensors.append(self._resize(x.unsqueeze(0))[0])
+            batch = torch.stack(tensors)
+
+        # troca de canais já na resolução reduzida (barato)
+        if channel_order == "BGR":
+            batch = batch.flip(1)
+
+        # uint8 -> float em [0, 1] (equivalente ao ToTensor), num passo só
+        if batch.dtype == torch.uint8:
+            batch = batch.float().div_(255)
+
+        return batch.to(self.device)
+
+    def predict_batch(self, images, channel_order="RGB", return_probs=False):
+        """
+        Classifica várias imagens com um único forward do SimpleCNN.
+
+        Args:
+            images: lista de imagens PIL / tensores uint8 3xHxW, ou tensor
+                uint8 Nx3xHxW (tensores float são usados como já normalizados)
+            channel_order (str): ordem de canais da entrada ('RGB' ou 'BGR')
+            return_probs (bool): inclui a probabilidade de cada espécie
+
+        Returns:
+            list[tuple]: (espécie ou None, confiança) para cada imagem, ou
+                (espécie ou None, confiança, {espécie: probabilidade}) com `return_probs`
+        """
+        x = self._to_batch(images, channel_order)
 
         with torch.no_grad():
             logits = self.model(x)
-            probs = torch.softmax(logits, dim=1)[0]
-
-        conf, idx = torch.max(probs, dim=0)
-
-        if conf.item() < self.threshold:
-            return None, conf.item()
-
-        species = "canino" if idx.item() == 0 else "felino"
-        return species, conf.item()
+            probs = torch.softmax(logits, dim=1)
+
+        confs, idxs = torch.max(probs, dim=1)
+
+        results = []
+        for conf, idx, p in zip(confs.tolist(), idxs.tolist(), probs.tolist()):
+            especie = SPECIES[idx] if conf >= self.threshold else None
+            if return_probs:
+                results.append((especie, conf, dict(zip(SPECIES, p))))
+            else:
+                results.append((especie, conf))
+        return results
+
+    def predict(self, image: Image.Image, channel_order="RGB"):
+        images = image if isinstance(image, torch.Tensor) else [image]
+        return self.predict_batch(images, channel_order)[0]
@@ -0,0 +1,22 @@
+import os
+import yaml
+
+# Caminho padrão do arquivo de configuração (pode ser sobrescrito via APP_CONFIG)
+CONFIG_PATH = os.environ.get("APP_CONFIG", "configs/app.yaml")
+
+
+def load_config(path: str = CONFIG_PATH):
+    """
+    Lê o YAML de configuração da API.
+
+    Args:
+        path (str): caminho do arquivo YAML
+
+    Returns:
+        dict: configuração carregada
+    """
+    with open(path) as f:
+        return yaml.safe_load(f) or {}
+
+
+CFG = load_config()
@@ -1,35 +1,112 @@
 # api_visao_computacional/app/detectron.py
 import os
+import torch
 from detectron2.config import get_cfg
 from detectron2.engine import DefaultPredictor
 
 # Base path onde estão os arquivos de configuração e pesos
 BASE_PATH = "models/detectron"
 
-def load_predictor(species: str):
+def build_cfg(species: str, yaml_path: str = None, weights_path: str = None):
     """
-    Carrega um predictor do Detectron2 para a espécie especificada ('canino' ou 'felino').
+    Monta a configuração do Detectron2 para a espécie especificada.
 
     Args:
         species (str): 'canino' ou 'felino'
+        yaml_path (str): YAML de inferência (padrão: models/detectron/<species>/)
+        weights_path (str): pesos treinados (padrão: models/detectron/<species>/)
 
     Returns:
-        DefaultPredictor: objeto para realizar inferência
+        CfgNode: configuração pronta para o DefaultPredictor
     """
     cfg = get_cfg()
 
     # Caminho do YAML de inferência (configuração)
-    yaml_path = os.path.join(BASE_PATH, species, f"inferencia_{species}.yaml")
+    if yaml_path is None:
+        yaml_path = os.path.join(BASE_PATH, species, f"inferencia_{species}.yaml")
     if not os.path.isfile(yaml_path):
         raise FileNotFoundError(f"Config file '{yaml_path}' não encontrado!")
 
     cfg.merge_from_file(yaml_path)
 
     # Caminho do modelo treinado
-    weights_path = os.path.join(BASE_PATH, species, f"model_final_{species}.pth")
+    if weights_path is None:
+        weights_path = os.path.join(BASE_PATH, species, f"model_final_{species}.pth")
     if not os.path.isfile(weights_path):
         raise FileNotFoundError(f"Modelo '{weights_path}' não encontrado!")
 
     cfg.MODEL.WEIGHTS = weights_path
     cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.5  # threshold de confiança
-    return DefaultPredictor(cfg)
+    return cfg
+
+
+def load_predictor(species: str):
+    """
+    Carrega um predictor do Detectron2 para a espécie especificada ('canino' ou 'felino').
+
+    Use `app.registry.registry.get_predictor` para compartilhar os pesos
+    já carregados; esta função sempre cria um modelo novo.
+
+    Args:
+        species (str): 'canino' ou 'felino'
+
+    Returns:
+        DefaultPredictor: objeto para realizar inferência
+    """
+    return DefaultPredictor(build_cfg(species))
+
+
+def predict_batch(predictor, images):
+    """
+    Executa o modelo de um DefaultPredictor em várias imagens numa única
+    chamada `model([inputs...])`.
+
+    Aplica o mesmo pré-processamento do `DefaultPredictor.__call__`
+    (formato de entrada e resize de teste) a cada imagem.
+
+    Args:
+        predictor (DefaultPredictor): predictor da espécie
+        images (list[np.ndarray]): imagens HxWxC (uint8)
+
+    Returns:
+        list[dict]: uma saída por imagem, no formato do DefaultPredictor
+    """
+    inputs = []
+    for original_image in images:
+        if predictor.input_format == "RGB":
+            original_image = original_image[:, :, ::-1]
+        height, width = original_image.shape[:2]
+        image = predictor.aug.get_transform(original_image).apply_image(original_image)
+        image = torch.as_tensor(image.astype("float32").transpose(2, 0, 1))
+        inputs.append({"image": image, "height": height, "width": width})
+
+    with torch.no_grad():
+        return predictor.model(inputs)
+
+
+def load_predictor_mmap(cfg, state_path: str):
+    """
+    DefaultPredictor cujos pesos ficam num arquivo mapeado em memória
+    (somente leitura), em vez de copiados para o heap do processo.
+
+    Workers no mesmo host (ou processos criados por fork após o carregamento)
+    compartilham a mesma cópia física via page cache.
+
+    Args:
+        cfg (CfgNode): configuração montada por `build_cfg`
+        state_path (str): state_dict convertido por scripts/convert_weights_mmap.py
+    """
+    if not os.path.isfile(state_path):
+        raise FileNotFoundError(
+            f"Pesos mmap '{state_path}' não encontrados! Rode scripts/convert_weights_mmap.py"
+        )
+
+    cfg = cfg.clone()
+    cfg.MODEL.WEIGHTS = ""  # não carrega o checkpoint no heap
+    predictor = DefaultPredictor(cfg)
+
+    state_dict = torch.load(state_path, map_location="cpu", mmap=True, weights_only=True)
+    # assign=True: os parâmetros passam a ser os próprios tensores mapeados
+    predictor.model.load_state_dict(state_dict, assign=True)
+    predictor.model.eval()
+    return predictor
@@ -0,0 +1,237 @@
+import asyncio
+import contextvars
+import math
+import multiprocessing
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+
+from app.config import CFG
+from app.profiling import ENABLED as PROFILING_ENABLED, current_session
+from app.workers import SharedImages, call_attached, init_worker
+
+# Prazo absoluto (time.monotonic) da requisição atual, se houver
+_deadline = contextvars.ContextVar("deadline", default=None)
+
+
+class QueueFull(Exception):
+    """
+    Fila de inferência cheia: a requisição é recusada na hora (429/503).
+    """
+
+    def __init__(self, retry_after):
+        super().__init__("Fila de inferência cheia")
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(Exception):
+    """
+    O prazo da requisição venceu antes de o trabalho começar.
+    """
+
+    def __init__(self):
+        super().__init__("Prazo da requisição expirado")
+
+
+def set_deadline(timeout_s):
+    """
+    Define o prazo da requisição atual (segundos a partir de agora; None = sem prazo).
+    """
+    _deadline.set(None if timeout_s is None else time.monotonic() + timeout_s)
+
+
+def current_deadline():
+    return _deadline.get()
+
+
+def remaining(deadline=None):
+    """
+    Segundos até o prazo (None se não houver prazo).
+    """
+    deadline = deadline if deadline is not None else _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def apply_deadline(headers):
+    """
+    Prazo da requisição a partir do header configurado (ms), ou o padrão
+    de `inference.default_deadline_ms`.
+    """
+    cfg = CFG.get("inference", {})
+    value = headers.get(cfg.get("deadline_header", "X-Deadline-Ms"))
+    try:
+        timeout_ms = float(value) if value is not None else cfg.get("default_deadline_ms")
+    except ValueError:
+        timeout_ms = cfg.get("default_deadline_ms")
+    set_deadline(None if timeout_ms is None else timeout_ms / 1000)
+
+
+def check_deadline():
+    left = remaining()
+    if left is not None and left <= 0:
+        get_executor().expired += 1
+        raise DeadlineExceeded()
+
+
+class InferenceExecutor:
+    """
+    Executa o trabalho CPU-bound (classificador, Detectron2, anotação)
+    fora do event loop.
+
+    No máximo `max_workers` tarefas rodam em paralelo; as demais esperam
+    sua vez sem bloquear o event loop. Tarefas cujo prazo vence na fila
+    são descartadas antes de rodar (`DeadlineExceeded`).
+
+    `admitted` limita as requisições no estágio de inferência a
+    `max_workers + max_queue`: acima disso a requisição é recusada na
+    hora (`QueueFull`), em vez de esperar atrás das outras.
+
+    No modo "process" as funções e argumentos precisam ser serializáveis
+    (funções de módulo, arrays, imagens); os modelos já carregados são
+    herdados pelos processos via fork. Cada processo fica fixo numa fatia
+    dos núcleos (`pin_cores`) e as imagens passam por memória
+    compartilhada (`run_images`), sem serializar os pixels.
+    """
+
+    def __init__(
+        self,
+        mode="thread",
+        max_workers=2,
+        max_queue=16,
+        torch_threads=None,
+        retry_after=1,
+        pin_cores=False,
+        cores_per_worker=None
+    ):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"Modo de executor inválido: '{mode}' (use 'thread' ou 'process')")
+
+        self.mode = mode
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.retry_after = retry_after
+
+        if mode == "process":
+            context = multiprocessing.get_context("fork")
+            self._pool = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=context,
+                initializer=init_worker,
+                initargs=(context.Value("i", 0), torch_threads, pin_cores, cores_per_worker, max_workers)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix="inference"
+            )
+
+        # vagas = tarefas em execução (a fila fica aqui, não dentro do pool,
+        # para que tarefas vencidas possam ser descartadas antes de rodar)
+        self._slots = asyncio.Semaphore(max_workers)
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted_count = 0
+        self.shed = 0
+        self.expired = 0
+
+    @classmethod
+    def from_config(cls, cfg: dict):
+        return cls(
+            mode=cfg.get("executor", "thread"),
+            max_workers=cfg.get("max_workers", 2),
+            max_queue=cfg.get("max_queue", 16),
+            torch_threads=cfg.get("torch_threads"),
+            retry_after=cfg.get("retry_after_s", 1),
+            pin_cores=cfg.get("pin_cores", False),
+            cores_per_worker=cfg.get("cores_per_worker")
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        """
+        Agenda `fn(*args, **kwargs)` no pool e aguarda o resultado.
+        """
+        # requisição perfilada: roda na thread do profiler, fora do pool
+        if PROFILING_ENABLED and current_session() is not None:
+            return await current_session().run(fn, *args, **kwargs)
+
+        self.waiting += 1
+        try:
+            left = remaining()
+            if left is not None and left <= 0:
+                raise asyncio.TimeoutError
+            await asyncio.wait_for(self._slots.acquire(), left)
+        except asyncio.TimeoutError:
+            self.expired += 1
+            raise DeadlineExceeded()
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool, partial(fn, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+            self._slots.release()
+
+    async def run_images(self, fn, images, *args):
+        """
+        Como `run(fn, images, *args)`, mas no modo "process" as imagens vão
+        para o worker por memória compartilhada. `fn` deve devolver dados
+        pequenos (ex.: `app.workers.to_compact`).
+        """
+        if self.mode != "process" or (PROFILING_ENABLED and current_session() is not None):
+            return await self.run(fn, images, *args)
+
+        with SharedImages(images) as packed:
+            return await self.run(call_attached, fn, packed, *args)
+
+    async def admitted(self, fn, *args, **kwargs):
+        """
+        Roda a corrotina `fn(*args, **kwargs)` (uma requisição inteira)
+        se houver vaga no estágio de inferência; senão recusa com `QueueFull`.
+        """
+        if self.admitted_count >= self.max_workers + self.max_queue:
+            self.shed += 1
+            raise QueueFull(self.estimate_retry_after())
+
+        self.admitted_count += 1
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            self.admitted_count -= 1
+
+    def estimate_retry_after(self):
+        """
+        Segundos sugeridos no Retry-After (pelo menos `retry_after`,
+        proporcional às requisições já admitidas por worker).
+        """
+        return max(1, math.ceil(self.retry_after * self.admitted_count / max(self.max_workers, 1)))
+
+    def stats(self):
+        return {
+            "mode": self.mode,
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted_count,
+            "shed": self.shed,
+            "expired": self.expired
+        }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+_executor = None
+
+
+def get_executor():
+    """
+    Retorna o executor compartilhado por todos os endpoints.
+    """
+    global _executor
+    if _executor is None:
+        _executor = InferenceExecutor.from_config(CFG.get("inference", {}))
+    return _executor
@@ -0,0 +1,124 @@
+import io
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+from app.metrics import Histogram
+
+# Ordem de canais do buffer decodificado (a mesma do INPUT.FORMAT dos YAMLs do Detectron)
+CHANNEL_ORDER = "BGR"
+
+# Como no pipeline original (PIL), a orientação EXIF não é aplicada: os
+# modelos e as caixas ficam no referencial dos pixels armazenados
+DECODE_FLAGS = cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION
+
+# Fatores de redução suportados pelo libjpeg (escala DCT)
+REDUCED_DECODE_FLAGS = {
+    1: DECODE_FLAGS,
+    2: cv2.IMREAD_REDUCED_COLOR_2 | cv2.IMREAD_IGNORE_ORIENTATION,
+    4: cv2.IMREAD_REDUCED_COLOR_4 | cv2.IMREAD_IGNORE_ORIENTATION,
+    8: cv2.IMREAD_REDUCED_COLOR_8 | cv2.IMREAD_IGNORE_ORIENTATION,
+}
+
+INGEST_BYTES_BUCKETS = [2 ** 20, 4 * 2 ** 20, 16 * 2 ** 20, 64 * 2 ** 20, 256 * 2 ** 20]
+
+# Tamanho do buffer decodificado, por requisição (cai com a decodificação
+# reduzida; não inclui cópias feitas depois pelos consumidores)
+ingest_bytes = Histogram(INGEST_BYTES_BUCKETS)
+
+
+def decode_image(file_bytes: bytes, track=True):
+    """
+    Decodifica os bytes enviados uma única vez, direto num buffer uint8
+    contíguo HxWx3 em BGR.
+
+    Classificador, Detectron2 e anotação usam views deste buffer
+    (ver `classifier_input`), sem cópias intermediárias.
+    """
+    # np.frombuffer não copia os bytes do upload
+    img = cv2.imdecode(np.frombuffer(file_bytes, dtype=np.uint8), DECODE_FLAGS)
+    if img is None:
+        raise ValueError("Imagem inválida ou formato não suportado")
+
+    if track:
+        ingest_bytes.observe(img.nbytes)
+    return img
+
+
+def reduction_factor(width, height, min_size, max_size):
+    """
+    Maior fator (1, 2, 4 ou 8) que ainda mantém a imagem decodificada
+    maior ou igual ao tamanho que o Detectron2 realmente usa
+    (mesma escala do ResizeShortestEdge: lado menor -> min_size,
+    limitado a max_size no lado maior).
+    """
+    scale = min(min_size / min(width, height), max_size / max(width, height))
+    factor = 1
+    for r in (2, 4, 8):
+        if r * scale <= 1:
+            factor = r
+    return factor
+
+
+def decode_for_inference(file_bytes: bytes, min_size=800, max_size=1333, max_pixels=None, track=True):
+    """
+    Como `decode_image`, mas JPEGs grandes são decodificados direto na
+    resolução reduzida (escala DCT do libjpeg), sem passar pela
+    resolução cheia.
+
+    Com `max_pixels`, o tamanho é lido do cabeçalho antes de decodificar
+    (qualquer formato): JPEGs são reduzidos até caber no limite e os
+    demais formatos (PNG, TIFF...) acima dele são recusados, sem alocar
+    o buffer.
+
+    Returns:
+        tuple: (buffer BGR, (sx, sy)) -- multiplicar as coordenadas
+            detectadas por (sx, sy) leva de volta à imagem original
+
+    Raises:
+        ValueError: imagem inválida ou maior que `max_pixels`
+    """
+    factor, size, fmt = 1, None, None
+    try:
+        with Image.open(io.BytesIO(file_bytes)) as im:
+            size, fmt = im.size, im.format
+    except Image.DecompressionBombError:
+        raise ValueError("Imagem grande demais")
+    except Exception:
+        pass  # o cv2 decide se a imagem é válida
+
+    if fmt == "JPEG":
+        factor = reduction_factor(*size, min_size, max_size)
+
+    if max_pixels and size is not None:
+        w, h = size
+        while (w // factor) * (h // factor) > max_pixels and fmt == "JPEG" and factor < 8:
+            factor *= 2
+        if (w // factor) * (h // factor) > max_pixels:
+            raise ValueError(f"Imagem grande demais: {w}x{h} (limite de {max_pixels} pixels)")
+
+    img = cv2.imdecode(np.frombuffer(file_bytes, dtype=np.uint8), REDUCED_DECODE_FLAGS[factor])
+    if img is None:
+        raise ValueError("Imagem inválida ou formato não suportado")
+
+    if track:
+        ingest_bytes.observe(img.nbytes)
+
+    if factor == 1:
+        return img, (1.0, 1.0)
+
+    w, h = size
+    return img, (w / img.shape[1], h / img.shape[0])
+
+
+def classifier_input(img):
+    """
+    View CHW (uint8, BGR) do buffer decodificado para o SpeciesClassifier.
+    """
+    return torch.from_numpy(img).permute(2, 0, 1)
+
+
+def ingest_stats():
+    return {"channel_order": CHANNEL_ORDER, "decoded_bytes_per_request": ingest_bytes.snapshot()}
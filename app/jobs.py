@@ -0,0 +1,306 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import CFG
+from app.executor import get_executor
+
+PENDING, RUNNING, DONE, ERROR = "PENDENTE", "PROCESSANDO", "CONCLUIDO", "ERRO"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL DEFAULT 0,
+    annotate TEXT,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id TEXT NOT NULL REFERENCES jobs(id),
+    idx INTEGER NOT NULL,
+    arquivo TEXT,
+    status TEXT NOT NULL,
+    data BLOB,
+    result TEXT,
+    worker TEXT,
+    updated_at REAL,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS job_items_status ON job_items (status);
+"""
+
+
+class JobQueue:
+    """
+    Fila persistente de jobs de predição (SQLite).
+
+    `submit` grava as imagens e devolve o id na hora; tarefas em segundo
+    plano drenam a fila por prioridade (maior primeiro, depois ordem de
+    chegada) usando o mesmo pipeline do /predict. Um item só é retirado
+    da fila quando não há requisições interativas esperando no executor,
+    de modo que jobs grandes não atrasam o /predict.
+
+    Os jobs sobrevivem a reinícios: itens que estavam em processamento
+    por um processo que não existe mais voltam para a fila.
+    """
+
+    def __init__(self, db_path="jobs/jobs.db", concurrency=1, poll_interval=0.05, retention_hours=72):
+        self.db_path = db_path
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.retention_hours = retention_hours
+        # host:pid:instância -- a instância muda a cada início, então um
+        # processo reiniciado com o mesmo host e pid (PID 1 no Docker) não
+        # se confunde com o anterior
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+        self._process = None
+        self._tasks = []
+        self._wake = None
+
+    # ---- acesso ao banco (roda no threadpool)
+    def _insert(self, job_id, items, priority, annotate):
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT INTO jobs (id, priority, annotate, created_at) VALUES (?, ?, ?, ?)",
+                    (job_id, priority, annotate, now)
+                )
+                self._db.executemany(
+                    "INSERT INTO job_items (job_id, idx, arquivo, status, data, updated_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(job_id, i, name, PENDING, data, now) for i, (name, data) in enumerate(items)]
+                )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _claim(self):
+        """
+        Marca o próximo item pendente como em processamento (atômico,
+        mesmo com vários processos usando o mesmo arquivo).
+        """
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    "SELECT i.job_id, i.idx, i.arquivo, i.data, j.annotate FROM job_items i "
+                    "JOIN jobs j ON j.id = i.job_id "
+                    "WHERE i.status = ? ORDER BY j.priority DESC, j.created_at, i.idx LIMIT 1",
+                    (PENDING,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE job_items SET status = ?, worker = ?, updated_at = ? "
+                        "WHERE job_id = ? AND idx = ?",
+                        (RUNNING, self.worker_id, time.time(), row[0], row[1])
+                    )
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        return row
+
+    def _finish(self, job_id, idx, result):
+        status = ERROR if result.get("status") == "erro" else DONE
+        with self._lock:
+            self._db.execute(
+                "UPDATE job_items SET status = ?, result = ?, data = NULL, updated_at = ? "
+                "WHERE job_id = ? AND idx = ?",
+                (status, json.dumps(result, ensure_ascii=False), time.time(), job_id, idx)
+            )
+
+    def _recover(self):
+        """
+        Devolve à fila itens presos em processamento por processos que
+        já terminaram (ex.: reinício do servidor) e apaga jobs antigos.
+        """
+        with self._lock:
+            workers = [
+                w for (w,) in self._db.execute(
+                    "SELECT DISTINCT worker FROM job_items WHERE status = ?", (RUNNING,)
+                )
+            ]
+            for worker in workers:
+                if worker and self._worker_alive(worker):
+                    continue
+                self._db.execute(
+                    "UPDATE job_items SET status = ?, worker = NULL WHERE status = ? AND worker IS ?",
+                    (PENDING, RUNNING, worker)
+                )
+
+            if self.retention_hours:
+                cutoff = time.time() - self.retention_hours * 3600
+                old = "SELECT id FROM jobs WHERE created_at < ?"
+                self._db.execute(f"DELETE FROM job_items WHERE job_id IN ({old})", (cutoff,))
+                self._db.execute("DELETE FROM jobs WHERE created_at < ?", (cutoff,))
+
+    def _worker_alive(self, worker):
+        """
+        Outro processo deste host, ainda vivo, que pode estar processando o
+        item. Ids com o nosso pid mas outra instância (ou de outro host)
+        são de execuções anteriores.
+        """
+        host, pid, *_ = worker.split(":")
+        if worker == self.worker_id:
+            return True
+        if host != socket.gethostname() or int(pid) == os.getpid():
+            return False
+        return _pid_alive(int(pid))
+
+    def _get(self, job_id):
+        with self._lock:
+            job = self._db.execute(
+                "SELECT priority, annotate, created_at FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            items = self._db.execute(
+                "SELECT arquivo, status, result FROM job_items WHERE job_id = ? ORDER BY idx",
+                (job_id,)
+            ).fetchall()
+
+        counts = {}
+        for _, status, _ in items:
+            counts[status] = counts.get(status, 0) + 1
+
+        finished = counts.get(DONE, 0) + counts.get(ERROR, 0)
+        if finished == len(items):
+            status = DONE
+        elif counts.get(RUNNING) or finished:
+            status = RUNNING
+        else:
+            status = PENDING
+
+        return {
+            "id": job_id,
+            "status": status,
+            "prioridade": job[0],
+            "annotate": job[1],
+            "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(job[2])),
+            "total": len(items),
+            "concluidos": finished,
+            "erros": counts.get(ERROR, 0),
+            "resultados": [
+                {"arquivo": name, **json.loads(result)}
+                for name, _, result in items if result is not None
+            ]
+        }
+
+    # ---- API assíncrona
+    async def submit(self, items, priority=0, annotate=None):
+        """
+        Grava o job (lista de (nome, bytes)) e devolve o id.
+        """
+        job_id = uuid.uuid4().hex
+        await run_in_threadpool(self._insert, job_id, items, priority, annotate)
+        if self._wake is not None:
+            self._wake.set()
+        return job_id
+
+    async def get(self, job_id):
+        return await run_in_threadpool(self._get, job_id)
+
+    async def start(self, process):
+        """
+        Inicia as tarefas que drenam a fila.
+
+        Args:
+            process: corrotina `process(nome, data, annotate)` -> resultado do /predict
+        """
+        self._process = process
+        self._wake = asyncio.Event()
+        await run_in_threadpool(self._recover)
+        self._tasks = [asyncio.ensure_future(self._drain()) for _ in range(self.concurrency)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def _interactive_busy(self):
+        executor = get_executor()
+        return executor.waiting > 0 or executor.admitted_count >= executor.max_workers
+
+    async def _drain(self):
+        while True:
+            # ---- /predict tem prioridade: espera o executor ter folga
+            if self._interactive_busy():
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            row = await run_in_threadpool(self._claim)
+            if row is None:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), 1.0)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, idx, name, data, annotate = row
+            try:
+                result = await self._process(name, data, annotate)
+            except asyncio.CancelledError:
+                raise  # o item volta para a fila no próximo início (_recover)
+            except Exception as exc:
+                result = {"status": "erro", "motivo": str(exc)}
+
+            await run_in_threadpool(self._finish, job_id, idx, result)
+
+    def stats(self):
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM job_items GROUP BY status"
+            ).fetchall()
+        return {"db_path": self.db_path, "concurrency": self.concurrency, "itens": dict(rows)}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+_queue = None
+
+
+def get_job_queue():
+    """
+    Retorna a fila de jobs (None se desabilitada em configs/app.yaml; é opt-in).
+
+    A primeira chamada abre/cria o banco SQLite: no event loop, chame
+    pelo threadpool.
+    """
+    global _queue
+    cfg = CFG.get("jobs", {})
+    if not cfg.get("enabled", False):
+        return None
+    if _queue is None:
+        _queue = JobQueue(
+            db_path=cfg.get("db_path", "jobs/jobs.db"),
+            concurrency=cfg.get("concurrency", 1),
+            poll_interval=cfg.get("poll_interval_s", 0.05),
+            retention_hours=cfg.get("retention_hours", 72)
+        )
+    return _queue
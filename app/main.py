@@ -1,128 +1,486 @@
-from fastapi import FastAPI, UploadFile, File
-import numpy as np
-import yaml
+import asyncio
+import io
+import json
+import zipfile
+from contextlib import asynccontextmanager
+from typing import List, Literal, Optional
+
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query, Request, Response, WebSocket
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from app.config import CFG
+
+from app.annotation import default_mode, get_writer, refresh_annotation
+from app.batching import batching_stats, render_batching_metrics
+from app.cache import get_cache
+from app.executor import DeadlineExceeded, QueueFull, apply_deadline, check_deadline, get_executor
+from app.jobs import get_job_queue
+from app.ingest import ingest_bytes, ingest_stats
+from app.metrics import render_counters, render_histograms
+from app.pipeline import (
+    INPUT_SIZES,
+    cache_key,
+    classify_batch,
+    decode,
+    predict_bytes,
+    request_tier,
+    run_pipeline,
+    serve_prediction,
+)
+from app.registry import registry
+from app.routing import routing_stats
+from app.tiers import resolve_tier, tier_names
+from app.prediction_log import get_prediction_logger
+from app.streaming import render_streaming_metrics, serve_stream, streaming_stats
+from app.timing import stage_seconds
+from app.utils import log_prediction
+from app.routers import detectron, outputs, profiles
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    jobs = await run_in_threadpool(get_job_queue)
+    if jobs is not None:
+        await jobs.start(_run_job)
+
+    yield
+
+    if jobs is not None:
+        await jobs.stop()
+    get_writer().shutdown()
+    get_executor().shutdown()
+
+    logger = get_prediction_logger()
+    if logger is not None:
+        logger.close()
 
-from app.classifier import SpeciesClassifier
-from app.detectron import load_predictor
-from app.utils import read_image, preprocess_classifier, save_annotated_image
-from app.routers import detectron
 
 # ======================
 # Instância única do FastAPI
 # ======================
-app = FastAPI(title="API Visão Computacional – Fígado")
+app = FastAPI(title="API Visão Computacional – Fígado", lifespan=lifespan)
+
+# ======================
+# Controle de admissão (fila cheia / prazo vencido)
+# ======================
+@app.exception_handler(QueueFull)
+async def queue_full_handler(request: Request, exc: QueueFull):
+    status = CFG.get("inference", {}).get("reject_status", 503)
+    return JSONResponse(
+        status_code=status,
+        content={"status": "erro", "motivo": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_handler(request: Request, exc: DeadlineExceeded):
+    return JSONResponse(status_code=504, content={"status": "erro", "motivo": str(exc)})
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
 
 # ======================
-# Load CONFIG
+# Endpoint principal
 # ======================
-with open("configs/app.yaml") as f:
-    CFG = yaml.safe_load(f)
+AnnotateMode = Optional[Literal["none", "lazy", "async", "sync"]]
+
+
+@app.post("/predict")
+async def predict(
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    annotate: AnnotateMode = None,
+    tier: Optional[str] = None,
+    tiled: bool = False
+):
+    return await serve_prediction(request, response, "/predict", file, annotate, tier, tiled)
+
 
 # ======================
-# Load MODELS (uma vez só)
+# Predição em lote (NDJSON)
 # ======================
-classifier = SpeciesClassifier(CFG["classifier"]["model"], threshold=0.7)
+async def _read_uploads(files):
+    """
+    Lê os arquivos enviados como (nome, bytes), recusando com 413 quando o
+    total passa de `ingestion.max_upload_bytes` (sem ler o excedente).
+    """
+    remaining = CFG.get("ingestion", {}).get("max_upload_bytes", 512 * 1024 ** 2)
+    uploads = []
+    for f in files:
+        data = await f.read(remaining + 1)
+        remaining -= len(data)
+        if remaining < 0:
+            raise HTTPException(status_code=413, detail="Envio grande demais")
+        uploads.append((f.filename or "", data))
+    return uploads
 
-predictors = {
-    "canino": load_predictor("canino"),
-    "felino": load_predictor("felino")
-}
 
+def _expand_uploads(uploads):
+    """
+    Expande arquivos .zip e devolve a lista de (nome, bytes) das imagens.
 
-VALID_LIVER_CLASSES = {
-    "canino": ["figado_cao", "processo_papilar_canino"],
-    "felino": ["figado_felino", "processo_papilar_felino"]
-}
+    O tamanho descompactado declarado de cada membro (que limita o que
+    `archive.read` produz) é conferido antes da leitura, contra os
+    limites de `ingestion` em configs/app.yaml: zips-bomba são recusados
+    com 413 sem descompactar nada.
+    """
+    cfg = CFG.get("ingestion", {})
+    max_members = cfg.get("max_zip_members", 1000)
+    max_member_bytes = cfg.get("max_zip_member_bytes", 64 * 1024 ** 2)
+    max_total_bytes = cfg.get("max_zip_total_bytes", 1024 ** 3)
+
+    items = []
+    for name, data in uploads:
+        if not name.lower().endswith(".zip"):
+            items.append((name, data))
+            continue
+
+        try:
+            archive = zipfile.ZipFile(io.BytesIO(data))
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail=f"Arquivo .zip inválido: {name}")
+
+        with archive:
+            members = [
+                info for info in archive.infolist()
+                if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS)
+            ]
+            if len(members) > max_members:
+                raise HTTPException(
+                    status_code=413, detail=f"{name}: {len(members)} imagens (limite {max_members})"
+                )
+            for info in members:
+                if info.file_size > max_member_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"{name}: {info.filename} tem {info.file_size} bytes descompactado "
+                               f"(limite {max_member_bytes})"
+                    )
+            total = sum(info.file_size for info in members)
+            if total > max_total_bytes:
+                raise HTTPException(
+                    status_code=413, detail=f"{name}: {total} bytes descompactado (limite {max_total_bytes})"
+                )
+
+            for info in members:
+                items.append((info.filename, archive.read(info)))
+    return items
+
+
+def _decode_all(items, tier=None, tiled=False):
+    """
+    Decodifica um bloco de imagens em (buffer, escala); imagens inválidas viram None.
+    """
+    images = []
+    for _, data in items:
+        try:
+            images.append(decode(data, tier, tiled))
+        except Exception:
+            images.append(None)
+    return images
+
+
+@app.post("/predict_batch")
+async def predict_batch(
+    files: List[UploadFile] = File(...),
+    annotate: AnnotateMode = None,
+    tier: Optional[str] = None,
+    tiled: bool = False
+):
+    """
+    Recebe várias imagens (ou arquivos .zip) e devolve um resultado por
+    imagem em NDJSON, na ordem em que ficam prontos.
+    """
+    annotate = annotate or default_mode()
+    tier = request_tier(tier)
+    cfg = CFG.get("batching", {})
+    chunk_size = cfg.get("classifier_batch_size", 32)
+    max_in_flight = cfg.get("max_images_in_flight", 64)
+
+    uploads = await _read_uploads(files)
+    items = await run_in_threadpool(_expand_uploads, uploads)
+
+    executor = get_executor()
+    cache = get_cache()
+    results = asyncio.Queue()
+    slots = asyncio.Semaphore(max_in_flight)
+
+    async def finish(name, key, data, decoded, especie, conf, probs):
+        image, scale = decoded
+        try:
+            result = await run_pipeline(data, image, especie, conf, annotate, scale, tier, tiled, probs)
+            if cache is not None:
+                await cache.put(key, result)
+        except Exception as exc:
+            result = {"status": "erro", "motivo": str(exc)}
+        finally:
+            slots.release()
+        await results.put({"arquivo": name, **result})
+
+    async def produce():
+        tasks = []
+        try:
+            await produce_chunks(tasks)
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def produce_chunks(tasks):
+        for i in range(0, len(items), chunk_size):
+            chunk = []
+            keys = []
+            for name, data in items[i:i + chunk_size]:
+                key = cache_key(data, "predict", annotate, tier, tiled) if cache is not None else None
+                cached = await cache.get(key) if cache is not None else None
+                if cached is not None:
+                    await results.put({"arquivo": name, **refresh_annotation(cached)})
+                    continue
+                await slots.acquire()
+                chunk.append((name, data))
+                keys.append(key)
+
+            if not chunk:
+                continue
+
+            # ---- decodifica e classifica o bloco inteiro de uma vez
+            images = await run_in_threadpool(_decode_all, chunk, tier, tiled)
+            valid = [decoded[0] for decoded in images if decoded is not None]
+            try:
+                preds = iter(await executor.run_images(classify_batch, valid) if valid else [])
+                error = None
+            except Exception as exc:
+                error = str(exc)
+
+            for (name, data), key, decoded in zip(chunk, keys, images):
+                if decoded is None or error is not None:
+                    slots.release()
+                    await results.put({
+                        "arquivo": name,
+                        "status": "erro",
+                        "motivo": "Imagem inválida" if decoded is None else error
+                    })
+                    continue
+                especie, conf, probs = next(preds)
+                tasks.append(asyncio.ensure_future(finish(name, key, data, decoded, especie, conf, probs)))
+
+    async def next_result(producer):
+        # ---- se o produtor falhar, não espera para sempre pelos resultados que faltam
+        if not results.empty():
+            return results.get_nowait()
+        getter = asyncio.ensure_future(results.get())
+        await asyncio.wait((getter, producer), return_when=asyncio.FIRST_COMPLETED)
+        if not getter.done() and producer.exception() is not None:
+            getter.cancel()
+            raise producer.exception()
+        return await getter
+
+    async def stream():
+        producer = asyncio.ensure_future(produce())
+        try:
+            for sent in range(len(items)):
+                try:
+                    result = await next_result(producer)
+                except Exception as exc:
+                    # ---- uma linha de erro para cada imagem que ficou sem resultado
+                    for _ in range(len(items) - sent):
+                        result = {"status": "erro", "motivo": str(exc)}
+                        log_prediction({"endpoint": "/predict_batch", **result})
+                        yield json.dumps(result, ensure_ascii=False) + "\n"
+                    return
+                log_prediction({"endpoint": "/predict_batch", **result})
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+        finally:
+            producer.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
 
-CLASS_NAMES = {
-    "canino": {
-        0: "figado_cao",
-        1: "processo_papilar_canino"
-    },
-    "felino": {
-        0: "figado_felino",
-        1: "processo_papilar_felino"
-    }
-}
 
 # ======================
-# Endpoint principal
+# Jobs assíncronos (fila persistente)
 # ======================
-@app.post("/predict")
-async def predict(file: UploadFile = File(...)):
-    # ---- read image
-    image = read_image(await file.read())
-
-    # ---- species classification
-    especie, conf = classifier.predict(image)
-
-    if especie is None:
-        return {
-            "status": "rejeitado",
-            "motivo": "Imagem não parece ser fígado de cão ou gato",
-            "confidence": round(conf, 3)
-        }
+async def _run_job(name, data, annotate):
+    """
+    Um item de job: mesmo pipeline (e cache) do /predict, no tier padrão.
+    """
+    tier = resolve_tier()
+    cache = get_cache()
+    if cache is None:
+        result = await predict_bytes(data, annotate, tier)
+    else:
+        result = await cache.get_or_compute(
+            cache_key(data, "predict", annotate, tier),
+            lambda: predict_bytes(data, annotate, tier)
+        )
+        result = refresh_annotation(result)
 
-    # ---- detectron inference
-    predictor = predictors[especie]
-    outputs = predictor(np.array(image))
-    instances = outputs["instances"].to("cpu")
+    log_prediction({"endpoint": "/jobs", "arquivo": name, **result})
+    return result
 
-    if len(instances) == 0:
-        return {
-            "status": "rejeitado",
-            "motivo": "Nenhuma estrutura hepática detectada"
-        }
 
-    # ---- extrair boxes, scores e classes corretamente
-    boxes = instances.pred_boxes.tensor
-    scores = instances.scores
-    classes = instances.pred_classes
+@app.post("/jobs", status_code=202)
+async def create_job(
+    files: List[UploadFile] = File(...),
+    priority: int = Query(0, ge=-100, le=100),
+    annotate: AnnotateMode = None
+):
+    """
+    Enfileira uma ou mais imagens (ou arquivos .zip) e devolve o id do job
+    na hora; o resultado fica em GET /jobs/{id}. Maior `priority` sai antes.
+    """
+    jobs = get_job_queue()
+    if jobs is None:
+        raise HTTPException(status_code=404, detail="Jobs desabilitados")
 
-    # ---- validar classes detectadas
-    detected_names = [CLASS_NAMES[especie][int(c)] for c in classes]
+    uploads = await _read_uploads(files)
+    items = await run_in_threadpool(_expand_uploads, uploads)
+    if not items:
+        raise HTTPException(status_code=400, detail="Nenhuma imagem enviada")
 
-    if not any(name in VALID_LIVER_CLASSES[especie] for name in detected_names):
-        return {
-            "status": "rejeitado",
-            "motivo": "Imagem não contém fígado"
-        }
+    job_id = await jobs.submit(items, priority, annotate or default_mode())
+    return {"id": job_id, "status": "PENDENTE", "total": len(items), "url": f"/jobs/{job_id}"}
 
-    # ---- criar lista de deteccoes
-    detections = []
-    for box, score, cls in zip(boxes, scores, classes):
-        cls_id = int(cls)
-        detections.append({
-            "classe": CLASS_NAMES[especie].get(cls_id, "desconhecida"),
-            "score": round(float(score), 3),
-            "bbox": [int(v) for v in box.tolist()]
-        })
-
-    # ---- salvar imagem anotada
-    image_path = save_annotated_image(
-        image=image,
-        instances=instances,
-        especie=especie,
-        class_names=CLASS_NAMES
-    )
 
-    return {
-        "status": "ok",
-        "especie": especie,
-        "confidence_especie": round(conf, 3),
-        "num_instancias": len(detections),
-        "deteccoes": detections,
-        "imagem_anotada": image_path
-    }
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    jobs = get_job_queue()
+    job = await jobs.get(job_id) if jobs is not None else None
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+    return job
+
+
+# ======================
+# Streaming de frames (vídeo cirúrgico / ultrassom)
+# ======================
+@app.websocket("/stream")
+async def stream(websocket: WebSocket, tier: Optional[str] = None):
+    """
+    Frames codificados (mensagens binárias) entram, um JSON com as
+    detecções sai por frame processado. Ver `app.streaming.FrameStream`.
+    """
+    try:
+        tier = resolve_tier(tier)
+    except ValueError as exc:
+        await websocket.close(code=1008, reason=str(exc))
+        return
+
+    executor = get_executor()
+
+    async def predict_frame(data, image, scale):
+        (especie, conf, probs), = await executor.run_images(classify_batch, [image])
+        return await run_pipeline(data, image, especie, conf, "none", scale, tier, probs=probs)
+
+    async def infer(data, image, scale):
+        # ---- mesma admissão e prazo do /predict (QueueFull/DeadlineExceeded recusam o frame)
+        apply_deadline(websocket.headers)
+        check_deadline()
+        return await executor.admitted(predict_frame, data, image, scale)
+
+    await serve_stream(websocket, lambda data: decode(data, tier), infer)
+
 
 # ======================
 # Router detectron separado
 # ======================
 app.include_router(detectron.router, prefix="/detectron")
+app.include_router(outputs.router, prefix="/outputs")
+app.include_router(profiles.router, prefix="/profiles")
 
 # ======================
 # Health check
 # ======================
 @app.get("/")
 def health():
-    return {"status": "ok", "models": ["canino", "felino"]}
+    return {
+        "status": "ok",
+        "models": ["canino", "felino"],
+        "executor": get_executor().stats()
+    }
+
+
+@app.get("/models")
+def models():
+    return registry.memory_report()
+
+
+@app.get("/batching")
+def batching():
+    return batching_stats()
+
+
+@app.get("/routing")
+def routing():
+    return routing_stats()
+
+
+@app.get("/streaming")
+def streaming():
+    return streaming_stats()
+
+
+@app.get("/tiers")
+def tiers():
+    return {
+        "default": resolve_tier(),
+        "tiers": {
+            name: {**CFG["tiers"][name], "input_size": list(INPUT_SIZES[name])}
+            for name in tier_names()
+        }
+    }
+
+
+@app.get("/annotations/{output_id}")
+def annotation_status(output_id: str):
+    status = get_writer().status(output_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail="Anotação não encontrada")
+    return status
+
+
+@app.get("/ingestion")
+def ingestion():
+    return ingest_stats()
+
+
+def render_admission_metrics():
+    stats = get_executor().stats()
+    return render_counters(
+        "liver_api_inference_rejected_total",
+        "Tarefas de inferência recusadas (fila cheia) ou descartadas (prazo vencido)",
+        [({"motivo": "fila_cheia"}, stats["shed"]), ({"motivo": "prazo_expirado"}, stats["expired"])]
+    ) + (
+        "# HELP liver_api_inference_queue Tarefas de inferência em execução / na fila\n"
+        "# TYPE liver_api_inference_queue gauge\n"
+        f'liver_api_inference_queue{{estado="executando"}} {stats["in_flight"]}\n'
+        f'liver_api_inference_queue{{estado="aguardando"}} {stats["waiting"]}\n'
+        f'liver_api_inference_queue{{estado="admitidas"}} {stats["admitted"]}\n'
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """
+    Métricas no formato texto do Prometheus (renderizadas só quando alguém consulta).
+    """
+    return PlainTextResponse(
+        stage_seconds.render()
+        + render_histograms(
+            "liver_api_ingest_bytes", "Tamanho do buffer decodificado, por requisição",
+            [({}, ingest_bytes)]
+        )
+        + render_batching_metrics()
+        + render_admission_metrics()
+        + render_streaming_metrics(),
+        media_type="text/plain; version=0.0.4"
+    )
+
+
+@app.get("/cache")
+def cache_stats():
+    cache = get_cache()
+    return cache.stats() if cache is not None else {"enabled": False}
@@ -0,0 +1,101 @@
+import bisect
+import threading
+
+
+class Histogram:
+    """
+    Histograma simples com buckets fixos (contagens cumulativas no
+    formato do Prometheus: cada bucket conta as observações <= limite).
+    """
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+
+        cumulative = {}
+        acc = 0
+        for le, c in zip(self.buckets + ["+Inf"], counts):
+            acc += c
+            cumulative[str(le)] = acc
+
+        return {"buckets": cumulative, "sum": round(total, 6), "count": count}
+
+
+class LabeledHistogram:
+    """
+    Família de histogramas com labels (um `Histogram` por combinação de
+    valores), exportada no formato texto do Prometheus.
+    """
+
+    def __init__(self, name, help_text, labelnames, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = buckets
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(values, Histogram(self.buckets))
+        return child
+
+    def observe(self, value, *values):
+        self.labels(*values).observe(value)
+
+    def render(self):
+        return render_histograms(
+            self.name, self.help_text,
+            [(dict(zip(self.labelnames, values)), h) for values, h in list(self._children.items())]
+        )
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def render_histograms(name, help_text, series):
+    """
+    Linhas no formato texto do Prometheus para uma lista de (labels, Histogram).
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in series:
+        snap = histogram.snapshot()
+        for le, count in snap["buckets"].items():
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': le})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {snap['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {snap['count']}")
+    return "\n".join(lines) + "\n"
+
+
+def render_counters(name, help_text, series):
+    """
+    Linhas no formato texto do Prometheus para uma lista de (labels, valor) de um counter.
+    """
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    for labels, value in series:
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
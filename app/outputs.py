@@ -0,0 +1,234 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from app.config import CFG
+from app.ingest import decode_for_inference
+from app.utils import draw_detections
+
+PREDICTION_ID = re.compile(r"^[0-9a-f]{32}$")
+
+FORMATS = {
+    "jpeg": (".jpg", "image/jpeg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", "image/webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+
+
+class PredictionStore:
+    """
+    Guarda a imagem original (bytes enviados, sem recodificar) e as
+    detecções de cada predição, para que a imagem anotada possa ser
+    renderizada sob demanda.
+
+    Predições mais antigas que `retention_hours`, ou as mais antigas
+    quando o total passa de `max_bytes`, são apagadas (no máximo uma
+    varredura a cada `prune_interval` segundos, durante `save`).
+    """
+
+    def __init__(self, store_dir="uploads", retention_hours=24, max_bytes=2 * 1024 ** 3, prune_interval=60):
+        self.store_dir = store_dir
+        self.retention_hours = retention_hours
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._prune_lock = threading.Lock()
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _paths(self, prediction_id):
+        base = os.path.join(self.store_dir, prediction_id)
+        return f"{base}.img", f"{base}.json"
+
+    def save(self, prediction_id, data: bytes, especie, detections):
+        img_path, meta_path = self._paths(prediction_id)
+        with open(img_path, "wb") as f:
+            f.write(data)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"especie": especie, "deteccoes": detections}, f, ensure_ascii=False)
+
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune()
+
+    def exists(self, prediction_id):
+        return bool(PREDICTION_ID.match(prediction_id)) and os.path.isfile(self._paths(prediction_id)[1])
+
+    def prune(self):
+        """
+        Aplica a retenção (idade e tamanho total) às predições guardadas.
+
+        Returns:
+            int: predições apagadas
+        """
+        if not self._prune_lock.acquire(blocking=False):
+            return 0  # outra thread já está varrendo
+        try:
+            self._last_prune = time.monotonic()
+
+            # ---- id -> (mtime mais recente, bytes)
+            entries = {}
+            with os.scandir(self.store_dir) as it:
+                for entry in it:
+                    prediction_id, _, ext = entry.name.partition(".")
+                    if ext not in ("img", "json") or not PREDICTION_ID.match(prediction_id):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    mtime, size = entries.get(prediction_id, (0.0, 0))
+                    entries[prediction_id] = (max(mtime, st.st_mtime), size + st.st_size)
+
+            cutoff = time.time() - self.retention_hours * 3600 if self.retention_hours else None
+            total = sum(size for _, size in entries.values())
+
+            removed = 0
+            for prediction_id, (mtime, size) in sorted(entries.items(), key=lambda e: e[1][0]):
+                expired = cutoff is not None and mtime < cutoff
+                if not expired and (not self.max_bytes or total <= self.max_bytes):
+                    break
+                for path in self._paths(prediction_id):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                total -= size
+                removed += 1
+            return removed
+        finally:
+            self._prune_lock.release()
+
+    def load(self, prediction_id):
+        """
+        Returns:
+            tuple: (bytes da imagem, registro) ou None se não existir
+        """
+        if not PREDICTION_ID.match(prediction_id):
+            return None
+        img_path, meta_path = self._paths(prediction_id)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                record = json.load(f)
+            with open(img_path, "rb") as f:
+                return f.read(), record
+        except (OSError, ValueError):
+            return None
+
+
+def decode_stored(data: bytes, max_size=None):
+    """
+    Decodifica uma imagem guardada para desenho, com o mesmo limite de
+    `ingestion.max_pixels` das requisições. JPEGs são decodificados já
+    reduzidos (escala DCT) quando só é preciso `max_size` px no lado maior.
+
+    Returns:
+        tuple: (buffer BGR, (sx, sy)) -- coordenadas da imagem original
+            divididas por (sx, sy) caem no buffer
+    """
+    limit = max_size or float("inf")
+    max_pixels = CFG.get("ingestion", {}).get("max_pixels", 64 * 1024 ** 2)
+    return decode_for_inference(data, limit, limit, max_pixels, track=False)
+
+
+def render(data: bytes, detections, fmt="jpeg", quality=90, max_size=None):
+    """
+    Renderiza a imagem anotada a partir da original e das detecções.
+
+    A imagem é reduzida antes do desenho (quando `max_size` é informado)
+    e as caixas são reescaladas para a nova resolução.
+
+    Returns:
+        bytes: imagem codificada no formato pedido
+    """
+    img, (sx, sy) = decode_stored(data, max_size)
+    h, w = img.shape[:2]
+
+    fx, fy = 1 / sx, 1 / sy
+    if max_size and max(h, w) > max_size:
+        scale = max_size / max(h, w)
+        img = cv2.resize(
+            img,
+            (max(1, round(w * scale)), max(1, round(h * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+        fx, fy = fx * scale, fy * scale
+
+    if (fx, fy) != (1.0, 1.0):
+        detections = [
+            {**det, "bbox": [v * f for v, f in zip(det["bbox"], (fx, fy, fx, fy))]}
+            for det in detections
+        ]
+
+    draw_detections(img, detections)
+
+    ext, _, quality_flag = FORMATS[fmt]
+    ok, buf = cv2.imencode(ext, img, [quality_flag, quality])
+    if not ok:
+        raise RuntimeError(f"Falha ao codificar imagem em {fmt}")
+    return buf.tobytes()
+
+
+class RenderCache:
+    """
+    LRU das variantes já renderizadas, limitado pelo total de bytes.
+    """
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body: bytes):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def variant_etag(prediction_id, fmt, quality, max_size):
+    key = f"{prediction_id}:{fmt}:{quality}:{max_size}"
+    return '"' + hashlib.sha1(key.encode()).hexdigest() + '"'
+
+
+_store = None
+_render_cache = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        cfg = CFG.get("annotation", {})
+        _store = PredictionStore(
+            cfg.get("store_dir", "uploads"),
+            retention_hours=cfg.get("store_retention_hours", 24),
+            max_bytes=cfg.get("store_max_bytes", 2 * 1024 ** 3)
+        )
+    return _store
+
+
+def get_render_cache():
+    global _render_cache
+    if _render_cache is None:
+        _render_cache = RenderCache(
+            CFG.get("annotation", {}).get("render_cache_bytes", 32 * 1024 * 1024)
+        )
+    return _render_cache
@@ -0,0 +1,250 @@
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+
+from app import profiling
+from app.annotation import annotate_prediction, default_mode, refresh_annotation
+from app.cache import ResultCache, get_cache
+from app.config import CFG
+from app.executor import DeadlineExceeded, QueueFull, apply_deadline, check_deadline, get_executor
+from app.ingest import CHANNEL_ORDER, classifier_input, decode_for_inference
+from app.registry import registry
+from app.routing import detect_routed, routing_config
+from app.tiers import input_size, resolve_tier, tier_names, tier_settings
+from app.tiling import tiling_config
+from app.timing import finish_timer, set_species, stage, start_timer
+from app.utils import log_prediction
+
+# ======================
+# Modelos (uma vez só, compartilhados por todos os endpoints)
+# ======================
+classifier = registry.get_classifier()
+
+predictors = {
+    "canino": registry.get_predictor("canino"),
+    "felino": registry.get_predictor("felino")
+}
+
+# Maior resolução que os detectores usam em cada tier (decodificação
+# reduzida de JPEGs grandes); também deixa os predictors dos tiers prontos
+INPUT_SIZES = {tier: input_size(tier) for tier in (None, *tier_names())}
+
+VALID_LIVER_CLASSES = {
+    "canino": ["figado_cao", "processo_papilar_canino"],
+    "felino": ["figado_felino", "processo_papilar_felino"]
+}
+
+# Motivo da rejeição pelo classificador (o /detectron/predict_auto mantém o texto original dele)
+SPECIES_REJECTION = "Imagem não parece ser fígado de cão ou gato"
+
+CLASS_NAMES = {
+    "canino": {
+        0: "figado_cao",
+        1: "processo_papilar_canino"
+    },
+    "felino": {
+        0: "figado_felino",
+        1: "processo_papilar_felino"
+    }
+}
+
+
+def decode(data: bytes, tier=None, tiled=False):
+    # limite de pixels para qualquer formato (JPEGs acima dele são reduzidos, os demais recusados)
+    max_pixels = CFG.get("ingestion", {}).get("max_pixels", 64 * 1024 ** 2)
+    if tiled:
+        # ---- tiles precisam da resolução original
+        return decode_for_inference(data, float("inf"), float("inf"), max_pixels)
+    if CFG.get("ingestion", {}).get("draft_decode", True):
+        return decode_for_inference(data, *INPUT_SIZES[tier], max_pixels)
+    return decode_for_inference(data, float("inf"), float("inf"), max_pixels)
+
+
+def request_tier(name):
+    """
+    Tier pedido na query (?tier=) ou o padrão; 400 se não existir.
+    """
+    try:
+        return resolve_tier(name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+
+# ======================
+# Tarefas de inferência (rodam no executor, fora do event loop)
+# ======================
+def classify_batch(images):
+    """
+    Returns:
+        list[tuple]: (espécie ou None, confiança, {espécie: probabilidade}) por imagem
+    """
+    return classifier.predict_batch(
+        [classifier_input(img) for img in images],
+        channel_order=CHANNEL_ORDER,
+        return_probs=True
+    )
+
+
+async def run_pipeline(
+    data, image, especie, conf, annotate, scale=(1.0, 1.0), tier=None, tiled=False, probs=None
+):
+    """
+    Etapas após a classificação de espécie: Detectron2, validação das
+    classes e imagem anotada. Retorna a resposta no formato do /predict.
+
+    `probs` ({espécie: probabilidade} do classificador) dá a confiança da
+    espécie escolhida quando a zona cinzenta troca a espécie do classificador.
+    """
+    # ---- detectron inference (um detector ou os dois, na zona cinzenta)
+    with stage("detect"):
+        routed = await detect_routed(image, especie, conf, classifier.threshold, tier, tiled)
+
+    if routed is None:
+        return {
+            "status": "rejeitado",
+            "motivo": SPECIES_REJECTION,
+            "confidence": round(conf, 3)
+        }
+
+    especie, instances, rota, scores_especie = routed
+    set_species(especie)
+    if probs is not None:
+        conf = probs[especie]
+
+    with stage("postprocess"):
+        # ---- caixas de volta para as coordenadas da imagem original
+        if scale != (1.0, 1.0):
+            instances.pred_boxes.scale(*scale)
+
+        if len(instances) == 0:
+            return {
+                "status": "rejeitado",
+                "motivo": "Nenhuma estrutura hepática detectada"
+            }
+
+        # ---- extrair boxes, scores e classes corretamente
+        boxes = instances.pred_boxes.tensor
+        scores = instances.scores
+        classes = instances.pred_classes
+
+        # ---- validar classes detectadas
+        detected_names = [CLASS_NAMES[especie][int(c)] for c in classes]
+
+        if not any(name in VALID_LIVER_CLASSES[especie] for name in detected_names):
+            return {
+                "status": "rejeitado",
+                "motivo": "Imagem não contém fígado"
+            }
+
+        # ---- criar lista de deteccoes
+        detections = []
+        for box, score, cls in zip(boxes, scores, classes):
+            cls_id = int(cls)
+            detections.append({
+                "classe": CLASS_NAMES[especie].get(cls_id, "desconhecida"),
+                "score": round(float(score), 3),
+                "bbox": [int(v) for v in box.tolist()]
+            })
+
+    # ---- imagem anotada (none | lazy | async | sync)
+    with stage("annotate"):
+        image_path, anotacao = await annotate_prediction(
+            annotate, data, image, instances, especie, detections, CLASS_NAMES, scale
+        )
+
+    return {
+        "status": "ok",
+        "especie": especie,
+        "confidence_especie": round(conf, 3),
+        "roteamento": rota,
+        **({"tier": tier} if tier else {}),
+        **({"tiled": True} if tiled else {}),
+        **({"scores_especie": scores_especie} if scores_especie else {}),
+        "num_instancias": len(detections),
+        "deteccoes": detections,
+        "imagem_anotada": image_path,
+        "anotacao": anotacao
+    }
+
+
+async def predict_bytes(data: bytes, annotate, tier=None, tiled=False):
+    """
+    Pipeline completo de uma imagem: decodificação, espécie e detecção.
+    """
+    executor = get_executor()
+
+    # ---- read image (decodificada uma vez, buffer BGR compartilhado)
+    with stage("decode"):
+        image, scale = await run_in_threadpool(decode, data, tier, tiled)
+
+    # ---- species classification
+    with stage("classify"):
+        (especie, conf, probs), = await executor.run_images(classify_batch, [image])
+
+    return await run_pipeline(data, image, especie, conf, annotate, scale, tier, tiled, probs)
+
+
+def cache_key(data: bytes, endpoint: str, annotate, tier=None, tiled=False):
+    # bytes da imagem + versão dos modelos + thresholds + modo de anotação + tier (nome e valores) + tiles
+    return ResultCache.make_key(
+        data, endpoint, registry.fingerprint(), classifier.threshold, routing_config(), annotate,
+        tier, tier_settings(tier), tiling_config() if tiled else None
+    )
+
+
+# ======================
+# Requisição de uma imagem (/predict e /detectron/predict_auto)
+# ======================
+async def serve_prediction(
+    request, response, endpoint, file, annotate=None, tier=None, tiled=False, species_rejection=None
+):
+    """
+    Tratamento comum das requisições de uma imagem: prazo, admissão no
+    executor, profiling sob demanda e cache. O timer das etapas e o log
+    são registrados também quando a requisição é recusada (fila cheia),
+    estoura o prazo ou falha.
+
+    `species_rejection` troca o motivo da rejeição pelo classificador na
+    resposta do endpoint (o resultado em cache é o mesmo do /predict).
+    """
+    timer = start_timer()
+    result = {"status": "erro"}
+    try:
+        apply_deadline(request.headers)
+        with stage("upload"):
+            data = await file.read()
+        annotate = annotate or default_mode()
+        tier = request_tier(tier)
+        check_deadline()
+
+        # ---- só entra no estágio de inferência se houver vaga (senão 429/503)
+        compute = lambda: get_executor().admitted(predict_bytes, data, annotate, tier, tiled)
+
+        cache = get_cache()
+        if profiling.ENABLED and profiling.should_profile(request.headers):
+            # ---- profiling sob demanda (sem cache, fora do micro-batching)
+            async with profiling.start_session() as session:
+                result = await compute()
+            response.headers["X-Profile-Id"] = session.id
+        elif cache is None:
+            result = await compute()
+        else:
+            result = await cache.get_or_compute(cache_key(data, "predict", annotate, tier, tiled), compute)
+            result = refresh_annotation(result)
+        if species_rejection and result.get("motivo") == SPECIES_REJECTION:
+            result = {**result, "motivo": species_rejection}
+        return result
+    except QueueFull as exc:
+        result = {"status": "recusado", "motivo": str(exc)}
+        raise
+    except DeadlineExceeded as exc:
+        result = {"status": "prazo_expirado", "motivo": str(exc)}
+        raise
+    except HTTPException as exc:
+        result = {"status": "invalido", "motivo": str(exc.detail)}
+        raise
+    except Exception as exc:
+        result = {"status": "erro", "motivo": str(exc)}
+        raise
+    finally:
+        finish_timer(timer, endpoint, result, response)
+        log_prediction({"endpoint": endpoint, "arquivo": file.filename, **result})
@@ -0,0 +1,175 @@
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from datetime import date, datetime
+
+from app.config import CFG
+
+CSV_FIELDS = ["timestamp", "status", "especie", "confidence_especie", "num_instancias", "motivo"]
+
+_STOP = object()
+
+
+class PredictionLogger:
+    """
+    Log de predições em JSONL (registro completo) e CSV (resumo).
+
+    `log` apenas enfileira o registro em memória; uma thread dedicada
+    grava os registros em lote quando o lote atinge `flush_size` ou a
+    cada `flush_interval` segundos, mantendo os arquivos abertos. Os
+    arquivos são rotacionados por tamanho e/ou na virada do dia.
+    """
+
+    def __init__(
+        self,
+        path="logs/predictions.jsonl",
+        flush_size=100,
+        flush_interval=1.0,
+        max_bytes=50 * 1024 * 1024,
+        rotate_daily=True,
+        max_queue=10000
+    ):
+        self.jsonl_path = path
+        self.csv_path = os.path.splitext(path)[0] + ".csv"
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.rotate_daily = rotate_daily
+
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._jsonl = None
+        self._csv = None
+        self._opened_on = None
+
+        self.written = 0
+        self.dropped = 0
+
+    def log(self, data: dict):
+        """
+        Enfileira um registro (não faz I/O na thread da requisição).
+        """
+        record = dict(data)
+        record["timestamp"] = datetime.now().isoformat()
+
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="prediction-log", daemon=True
+                )
+                self._thread.start()
+
+    # ---- thread de escrita
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            try:
+                item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                if batch:
+                    self._write(batch)
+                self._close_files()
+                return
+
+            if item is not None:
+                batch.append(item)
+
+            if len(batch) >= self.flush_size or time.monotonic() >= deadline:
+                if batch:
+                    self._write(batch)
+                    batch = []
+                deadline = time.monotonic() + self.flush_interval
+
+    def _open_files(self):
+        os.makedirs(os.path.dirname(self.jsonl_path) or ".", exist_ok=True)
+        self._jsonl = open(self.jsonl_path, "a", encoding="utf-8")
+        self._csv = open(self.csv_path, "a", newline="", encoding="utf-8")
+        self._csv_writer = csv.DictWriter(self._csv, fieldnames=CSV_FIELDS, extrasaction="ignore")
+        if self._csv.tell() == 0:
+            self._csv_writer.writeheader()
+        self._opened_on = date.today()
+
+    def _close_files(self):
+        for f in (self._jsonl, self._csv):
+            if f is not None:
+                f.close()
+        self._jsonl = self._csv = None
+
+    def _rotate_if_needed(self):
+        if self._jsonl is None:
+            self._open_files()
+            return
+
+        too_big = self.max_bytes and self._jsonl.tell() >= self.max_bytes
+        new_day = self.rotate_daily and date.today() != self._opened_on
+        if not (too_big or new_day):
+            return
+
+        self._close_files()
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        for path in (self.jsonl_path, self.csv_path):
+            base, ext = os.path.splitext(path)
+            if os.path.exists(path):
+                os.replace(path, f"{base}-{stamp}{ext}")
+        self._open_files()
+
+    def _write(self, batch):
+        try:
+            self._rotate_if_needed()
+            self._jsonl.write(
+                "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in batch)
+            )
+            self._csv_writer.writerows(batch)
+            self._jsonl.flush()
+            self._csv.flush()
+            self.written += len(batch)
+        except OSError:
+            self.dropped += len(batch)
+
+    def close(self):
+        """
+        Grava o que estiver pendente e encerra a thread (chamado no shutdown).
+        """
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+
+
+_logger = None
+
+
+def get_prediction_logger():
+    """
+    Retorna o logger de predições, ou None se `logging.enabled` for falso.
+    """
+    global _logger
+    cfg = CFG.get("logging", {})
+    if not cfg.get("enabled", False):
+        return None
+    if _logger is None:
+        _logger = PredictionLogger(
+            path=cfg.get("path", "logs/predictions.jsonl"),
+            flush_size=cfg.get("flush_size", 100),
+            flush_interval=cfg.get("flush_interval_s", 1.0),
+            max_bytes=cfg.get("max_bytes", 50 * 1024 * 1024),
+            rotate_daily=cfg.get("rotate_daily", True)
+        )
+    return _logger
@@ -0,0 +1,195 @@
+import asyncio
+import contextvars
+import cProfile
+import hmac
+import os
+import random
+import re
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from app.config import CFG
+
+PROFILING = CFG.get("profiling", {})
+
+# Checado uma vez por requisição; desligado, nada mais é executado
+ENABLED = bool(PROFILING.get("enabled", False))
+
+MODES = ("torch", "cprofile", "both")
+
+TOKEN_HEADER = "x-profile-token"
+
+PROFILE_FILE_RE = re.compile(r"^[0-9a-f]{32}\.(trace\.json|ops\.txt|pstats)$")
+
+# Sessão de profiling da requisição atual (None fora de uma requisição perfilada)
+_session = contextvars.ContextVar("profile_session", default=None)
+
+
+def profile_dir():
+    return PROFILING.get("dir", "profiles")
+
+
+def _token():
+    return os.environ.get("APP_PROFILE_TOKEN") or PROFILING.get("token")
+
+
+def authorized(headers):
+    """
+    Header X-Profile-Token confere com o token de admin configurado.
+    """
+    token = _token()
+    sent = headers.get(TOKEN_HEADER)
+    return bool(token and sent) and hmac.compare_digest(sent, token)
+
+
+def should_profile(headers):
+    """
+    Perfila a requisição se o admin pediu (header) ou por amostragem.
+    Só deve ser chamada quando `ENABLED` é verdadeiro.
+    """
+    if authorized(headers):
+        return True
+    rate = PROFILING.get("sample_rate", 0.0)
+    return rate > 0 and random.random() < rate
+
+
+def current_session():
+    return _session.get()
+
+
+class ProfileSession:
+    """
+    Perfila as chamadas de modelo de uma única requisição.
+
+    Todas as tarefas de inferência da requisição rodam numa thread
+    dedicada (fora do executor e do micro-batching), para que o
+    torch.profiler e o cProfile vejam só esta requisição. Ao final grava
+    o trace do Chrome (<id>.trace.json), a tabela de operadores
+    (<id>.ops.txt) e/ou as estatísticas do cProfile (<id>.pstats).
+    """
+
+    def __init__(self, mode="torch", out_dir="profiles"):
+        if mode not in MODES:
+            raise ValueError(f"Modo de profiling inválido: '{mode}' (use {', '.join(MODES)})")
+
+        self.id = uuid.uuid4().hex
+        self.mode = mode
+        self.out_dir = out_dir
+        self.files = []
+
+        self._thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+        self._torch_prof = None
+        self._cprof = None
+        self._token = None
+
+    # ---- rodam na thread dedicada
+    def _start(self):
+        if self.mode in ("torch", "both"):
+            from torch.profiler import ProfilerActivity, profile
+
+            self._torch_prof = profile(
+                activities=[ProfilerActivity.CPU],
+                record_shapes=True,
+                profile_memory=True
+            )
+            self._torch_prof.__enter__()
+
+        if self.mode in ("cprofile", "both"):
+            self._cprof = cProfile.Profile()
+            self._cprof.enable()
+
+    def _stop(self):
+        os.makedirs(self.out_dir, exist_ok=True)
+
+        if self._cprof is not None:
+            self._cprof.disable()
+            path = os.path.join(self.out_dir, f"{self.id}.pstats")
+            self._cprof.dump_stats(path)
+            self.files.append(path)
+
+        if self._torch_prof is not None:
+            self._torch_prof.__exit__(None, None, None)
+
+            path = os.path.join(self.out_dir, f"{self.id}.trace.json")
+            self._torch_prof.export_chrome_trace(path)
+            self.files.append(path)
+
+            path = os.path.join(self.out_dir, f"{self.id}.ops.txt")
+            table = self._torch_prof.key_averages().table(sort_by="self_cpu_time_total", row_limit=50)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(table)
+            self.files.append(path)
+
+        _prune(self.out_dir, PROFILING.get("max_files", 100))
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._thread, partial(fn, *args, **kwargs))
+
+    async def __aenter__(self):
+        await self.run(self._start)
+        self._token = _session.set(self)
+        return self
+
+    async def __aexit__(self, *exc):
+        _session.reset(self._token)
+        try:
+            await self.run(self._stop)
+        finally:
+            self._thread.shutdown(wait=False)
+        return False
+
+
+def start_session():
+    return ProfileSession(PROFILING.get("mode", "torch"), profile_dir())
+
+
+def _prune(out_dir, max_files):
+    """
+    Mantém só os `max_files` arquivos mais recentes.
+    """
+    entries = list_profiles(out_dir)
+    for entry in entries[max_files:]:
+        try:
+            os.remove(os.path.join(out_dir, entry["arquivo"]))
+        except OSError:
+            pass
+
+
+def list_profiles(out_dir=None):
+    """
+    Arquivos de profiling gravados, do mais recente ao mais antigo.
+    """
+    out_dir = out_dir or profile_dir()
+    if not os.path.isdir(out_dir):
+        return []
+
+    entries = []
+    for name in os.listdir(out_dir):
+        if not PROFILE_FILE_RE.match(name):
+            continue
+        stat = os.stat(os.path.join(out_dir, name))
+        entries.append({
+            "arquivo": name,
+            "id": name.split(".", 1)[0],
+            "bytes": stat.st_size,
+            "criado_em": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)),
+            "_mtime": stat.st_mtime
+        })
+
+    entries.sort(key=lambda e: e["_mtime"], reverse=True)
+    for e in entries:
+        del e["_mtime"]
+    return entries
+
+
+def profile_path(name):
+    """
+    Caminho de um arquivo de profiling (None se o nome for inválido ou não existir).
+    """
+    if not PROFILE_FILE_RE.match(name):
+        return None
+    path = os.path.join(profile_dir(), name)
+    return path if os.path.isfile(path) else None
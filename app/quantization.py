@@ -0,0 +1,165 @@
+import io
+import json
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization import (
+    DeQuantStub,
+    QuantStub,
+    convert,
+    get_default_qconfig,
+    prepare,
+    quantize_dynamic,
+)
+
+
+def _qengine():
+    engine = torch.backends.quantized.engine
+    return engine if engine in ("x86", "fbgemm", "qnnpack") else "fbgemm"
+
+
+def report_path(quantized_path: str):
+    return quantized_path + ".report.json"
+
+
+def check_approved(quantized_path: str):
+    """
+    Só permite carregar um modelo quantizado aprovado pelo
+    scripts/quantize_models.py (queda de acurácia dentro do limite).
+    """
+    try:
+        with open(report_path(quantized_path), encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        raise RuntimeError(
+            f"Modelo quantizado '{quantized_path}' sem relatório de avaliação; "
+            "rode scripts/quantize_models.py"
+        )
+    if not report.get("approved"):
+        raise RuntimeError(
+            f"Modelo quantizado '{quantized_path}' reprovado no gate de acurácia "
+            f"(ver {report_path(quantized_path)})"
+        )
+    return report
+
+
+class QuantizedHead(nn.Module):
+    """
+    Envolve um submódulo float com Quant/DeQuant para quantização estática.
+    """
+
+    def __init__(self, head):
+        super().__init__()
+        self.quant = QuantStub()
+        self.head = head
+        self.dequant = DeQuantStub()
+        if hasattr(head, "output_shape"):
+            self.output_shape = head.output_shape
+
+    def forward(self, x):
+        return self.dequant(self.head(self.quant(x)))
+
+
+# ======================
+# Detectron2 (box head / camadas FC)
+# ======================
+def quantize_detector_dynamic(model):
+    """
+    Quantização dinâmica INT8 das camadas Linear do box head e do box predictor.
+    """
+    torch.backends.quantized.engine = _qengine()
+    roi_heads = model.roi_heads
+    roi_heads.box_head = quantize_dynamic(roi_heads.box_head, {nn.Linear}, dtype=torch.qint8)
+    roi_heads.box_predictor = quantize_dynamic(roi_heads.box_predictor, {nn.Linear}, dtype=torch.qint8)
+    return model
+
+
+def quantize_detector_static(model, calibrate):
+    """
+    Quantização estática INT8 do box head.
+
+    Args:
+        model: GeneralizedRCNN em modo eval
+        calibrate (callable): roda o modelo nas imagens de calibração
+    """
+    engine = _qengine()
+    torch.backends.quantized.engine = engine
+
+    head = QuantizedHead(model.roi_heads.box_head)
+    head.qconfig = get_default_qconfig(engine)
+    model.roi_heads.box_head = prepare(head.eval())
+
+    with torch.no_grad():
+        calibrate()
+
+    model.roi_heads.box_head = convert(model.roi_heads.box_head)
+    return model
+
+
+def load_quantized_predictor(cfg, quantized_path: str):
+    """
+    DefaultPredictor com o modelo INT8 salvo pelo scripts/quantize_models.py.
+
+    O predictor é montado sem o `__init__` do DefaultPredictor, que
+    construiria o modelo float e carregaria o checkpoint só para descartá-los.
+    """
+    import detectron2.data.transforms as T
+    from detectron2.engine import DefaultPredictor
+
+    check_approved(quantized_path)
+    torch.backends.quantized.engine = _qengine()
+
+    model = torch.load(quantized_path, map_location="cpu", weights_only=False).eval()
+
+    predictor = DefaultPredictor.__new__(DefaultPredictor)
+    predictor.cfg = cfg.clone()
+    predictor.aug = T.ResizeShortestEdge(
+        [cfg.INPUT.MIN_SIZE_TEST, cfg.INPUT.MIN_SIZE_TEST], cfg.INPUT.MAX_SIZE_TEST
+    )
+    predictor.input_format = cfg.INPUT.FORMAT
+
+    # thresholds de teste vêm da configuração da API, não da avaliação
+    box_predictor = model.roi_heads.box_predictor
+    box_predictor.test_score_thresh = cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST
+    box_predictor.test_nms_thresh = cfg.MODEL.ROI_HEADS.NMS_THRESH_TEST
+    box_predictor.test_topk_per_image = cfg.TEST.DETECTIONS_PER_IMAGE
+
+    predictor.model = model
+    return predictor
+
+
+# ======================
+# SimpleCNN (classificador)
+# ======================
+def quantize_classifier_dynamic(model):
+    torch.backends.quantized.engine = _qengine()
+    return quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def quantize_classifier_static(model, calibration_batches):
+    """
+    Quantização estática INT8 (FX) do SimpleCNN: convoluções e camada final.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = _qengine()
+    torch.backends.quantized.engine = engine
+
+    example = calibration_batches[0]
+    prepared = prepare_fx(model.eval(), get_default_qconfig_mapping(engine), (example,))
+
+    with torch.no_grad():
+        for batch in calibration_batches:
+            prepared(batch)
+
+    return convert_fx(prepared)
+
+
+def serialized_bytes(model):
+    """
+    Tamanho do state_dict serializado (inclui pesos INT8 empacotados).
+    """
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
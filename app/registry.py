@@ -0,0 +1,187 @@
+import hashlib
+import os
+import threading
+import time
+
+from app.config import CFG
+
+
+def _rss_bytes():
+    """
+    Memória residente (RSS) atual do processo, em bytes (somente Linux).
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _model_bytes(model):
+    """
+    Bytes ocupados pelos parâmetros e buffers de um nn.Module
+    (ou o tamanho do arquivo, para sessões do ONNX Runtime).
+    """
+    if model is None:
+        return 0
+    if not hasattr(model, "parameters"):
+        return getattr(model, "nbytes", 0)
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors)
+
+
+class ModelRegistry:
+    """
+    Registro único dos modelos carregados no processo.
+
+    Cada modelo é identificado por (espécie, caminho dos pesos, hash da
+    configuração) e carregado uma única vez; todos os pontos de entrada
+    (app.main, routers, services, scripts) resolvem os modelos por aqui.
+    """
+
+    def __init__(self, cfg: dict = None):
+        self.cfg = CFG if cfg is None else cfg
+        self._models = {}
+        self._info = {}
+        self._aliases = {}
+        self._fingerprint = self._compute_fingerprint()
+        self._lock = threading.Lock()
+
+    def _load(self, key, loader, module_of):
+        with self._lock:
+            if key not in self._models:
+                rss_before = _rss_bytes()
+                start = time.perf_counter()
+
+                model = loader()
+
+                rss_after = _rss_bytes()
+                self._models[key] = model
+                self._info[key] = {
+                    "especie": key[0],
+                    "pesos": key[1],
+                    "config_hash": key[2],
+                    "param_bytes": _model_bytes(module_of(model)),
+                    "rss_delta_bytes": (
+                        rss_after - rss_before
+                        if rss_before is not None and rss_after is not None
+                        else None
+                    ),
+                    "load_seconds": round(time.perf_counter() - start, 3)
+                }
+                self._fingerprint = self._compute_fingerprint()
+            return self._models[key]
+
+    def get_predictor(self, species: str, tier: str = None):
+        """
+        Retorna o DefaultPredictor compartilhado da espécie ('canino' ou 'felino').
+
+        Com `tier` (ver configs/app.yaml), retorna uma visão do predictor
+        base com tamanho de entrada e limites de propostas próprios, que
+        usa os mesmos pesos já carregados.
+        """
+        # caminho rápido: evita remontar a configuração a cada chamada
+        alias = ("predictor", species, tier)
+        if alias in self._aliases:
+            return self._models[self._aliases[alias]]
+
+        if tier is not None:
+            from app.tiers import tier_predictor
+
+            base = self.get_predictor(species)
+            _, weights, config_hash = self._aliases[("predictor", species, None)]
+            key = (species, weights, f"{config_hash}/{tier}")
+
+            # pesos compartilhados com o predictor base: não somam memória
+            predictor = self._load(key, lambda: tier_predictor(base, tier), lambda p: None)
+            self._aliases[alias] = key
+            return predictor
+
+        from detectron2.engine import DefaultPredictor
+        from app.backends import ExportedPredictor, exported_path, mmap_path
+        from app.detectron import build_cfg, load_predictor_mmap
+
+        paths = self.cfg.get("detectron", {}).get(species, {})
+        cfg = build_cfg(species, paths.get("config"), paths.get("weights"))
+
+        backend = paths.get("backend", "eager")
+        use_mmap = backend == "eager" and self.cfg.get("weights", {}).get("mmap", False)
+        weights = mmap_path(cfg.MODEL.WEIGHTS) if use_mmap else exported_path(cfg.MODEL.WEIGHTS, backend)
+
+        config_hash = hashlib.sha256(cfg.dump().encode()).hexdigest()[:12]
+        key = (species, weights, config_hash)
+
+        if use_mmap:
+            loader = lambda: load_predictor_mmap(cfg, weights)
+        elif backend == "eager":
+            loader = lambda: DefaultPredictor(cfg)
+        elif backend == "int8":
+            from app.quantization import load_quantized_predictor
+            loader = lambda: load_quantized_predictor(cfg, weights)
+        else:
+            loader = lambda: ExportedPredictor(cfg, weights, backend)
+
+        predictor = self._load(key, loader, lambda p: getattr(p, "graph", p.model))
+        self._aliases[alias] = key
+        return predictor
+
+    def get_classifier(self, threshold=None):
+        """
+        Retorna o SpeciesClassifier compartilhado.
+
+        O threshold (padrão: `classifier.threshold` de configs/app.yaml)
+        vale para a instância compartilhada e é definido pelo primeiro chamador.
+        """
+        from app.backends import exported_path, mmap_path
+        from app.classifier import SpeciesClassifier
+
+        model_path = self.cfg["classifier"]["model"]
+        backend = self.cfg["classifier"].get("backend", "eager")
+        use_mmap = backend == "eager" and self.cfg.get("weights", {}).get("mmap", False)
+        path = mmap_path(model_path) if use_mmap else exported_path(model_path, backend)
+        key = ("classifier", path, None)
+        if threshold is None:
+            threshold = self.cfg["classifier"].get("threshold", 0.7)
+
+        return self._load(
+            key,
+            lambda: SpeciesClassifier(model_path, threshold=threshold, backend=backend, mmap=use_mmap),
+            lambda c: c.model
+        )
+
+    def fingerprint(self):
+        """
+        Identifica a versão dos modelos carregados (caminho, hash da
+        configuração, tamanho e data dos pesos). Usado nas chaves de cache.
+
+        Calculado quando um modelo é carregado, não a cada requisição.
+        """
+        return self._fingerprint
+
+    def _compute_fingerprint(self):
+        keys = sorted(self._info, key=str)
+
+        parts = []
+        for name, path, config_hash in keys:
+            try:
+                st = os.stat(path)
+                parts.append(f"{name}:{path}:{config_hash}:{st.st_size}:{int(st.st_mtime)}")
+            except OSError:
+                parts.append(f"{name}:{path}:{config_hash}")
+        return hashlib.sha256("|".join(parts).encode()).hexdigest()[:16]
+
+    def memory_report(self):
+        """
+        Memória ocupada por cada modelo carregado.
+        """
+        with self._lock:
+            models = [dict(info) for info in self._info.values()]
+        return {
+            "models": models,
+            "total_param_bytes": sum(m["param_bytes"] for m in models),
+            "process_rss_bytes": _rss_bytes()
+        }
+
+
+# Instância compartilhada por todo o processo
+registry = ModelRegistry()
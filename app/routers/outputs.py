@@ -0,0 +1,51 @@
+from typing import Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import CFG
+from app.outputs import FORMATS, get_render_cache, get_store, render, variant_etag
+
+router = APIRouter()
+
+
+@router.get("/{prediction_id}")
+async def get_output(
+    prediction_id: str,
+    request: Request,
+    format: Literal["jpeg", "webp"] = "jpeg",
+    quality: int = Query(90, ge=1, le=100),
+    max_size: Optional[int] = Query(None, ge=16, le=8192)
+):
+    """
+    Imagem anotada da predição, renderizada sob demanda.
+    """
+    etag = variant_etag(prediction_id, format, quality, max_size)
+    headers = {
+        "ETag": etag,
+        "Cache-Control": CFG.get("annotation", {}).get("cache_control", "private, max-age=86400")
+    }
+
+    # ---- id desconhecido (ou já apagado pela retenção): 404, mesmo com If-None-Match
+    store = get_store()
+    if not await run_in_threadpool(store.exists, prediction_id):
+        raise HTTPException(status_code=404, detail="Predição não encontrada")
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    cache = get_render_cache()
+    body = cache.get(etag)
+
+    if body is None:
+        stored = await run_in_threadpool(store.load, prediction_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Predição não encontrada")
+
+        data, record = stored
+        body = await run_in_threadpool(
+            render, data, record["deteccoes"], format, quality, max_size
+        )
+        cache.put(etag, body)
+
+    return Response(content=body, media_type=FORMATS[format][1], headers=headers)
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse
+
+from app import profiling
+
+router = APIRouter()
+
+
+def _check_admin(request: Request):
+    if not profiling.ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling desabilitado")
+    if not profiling.authorized(request.headers):
+        raise HTTPException(status_code=403, detail="Token de profiling inválido")
+
+
+@router.get("")
+def list_profiles(request: Request):
+    """
+    Traces e estatísticas gravados por requisições perfiladas (mais recentes primeiro).
+    """
+    _check_admin(request)
+    return profiling.list_profiles()
+
+
+@router.get("/{name}")
+def get_profile(name: str, request: Request):
+    """
+    Baixa um arquivo de profiling: <id>.trace.json (chrome://tracing / Perfetto),
+    <id>.ops.txt (tabela de operadores) ou <id>.pstats (cProfile / snakeviz).
+    """
+    _check_admin(request)
+    path = profiling.profile_path(name)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile não encontrado")
+    return FileResponse(path, filename=name)
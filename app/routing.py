@@ -0,0 +1,69 @@
+import asyncio
+
+from app.batching import detect
+from app.config import CFG
+from app.tiling import detect_tiled
+
+ROUTES = ("classificador", "ambos", "rejeitado")
+
+# Requisições por rota (GET /routing)
+route_counts = {route: 0 for route in ROUTES}
+
+
+def routing_config():
+    """
+    Modo de roteamento e início da zona cinzenta (configs/app.yaml).
+
+    O classificador tem 2 classes (confiança sempre >= 0.5), então
+    gray_zone_min só faz sentido acima de 0.5.
+    """
+    cfg = CFG.get("routing", {})
+    return cfg.get("mode", "reject"), cfg.get("gray_zone_min", 0.6)
+
+
+def _best_score(instances):
+    return instances.scores.max().item() if len(instances) > 0 else 0.0
+
+
+async def detect_routed(image, especie, conf, threshold, tier=None, tiled=False):
+    """
+    Escolhe quais detectores rodar a partir da confiança do classificador.
+
+    - confiança >= threshold: só o detector da espécie classificada;
+    - zona cinzenta (gray_zone_min <= confiança < threshold), modo "cascade":
+      os detectores canino e felino rodam em paralelo e a espécie é a
+      de maior score de detecção (como `predict_image_auto`, mas com a
+      latência de um modelo só);
+    - abaixo disso (ou modo "reject"): rejeita.
+
+    Os detectores rodam no `tier` pedido (None = configuração base) e,
+    com `tiled`, por janelas deslizantes (ver `app.tiling`).
+
+    Returns:
+        tuple: (espécie, Instances, rota, scores por espécie) ou None se rejeitada
+    """
+    mode, gray_zone_min = routing_config()
+    run = detect_tiled if tiled else detect
+
+    if especie is not None:
+        route_counts["classificador"] += 1
+        instances = await run(especie, image, tier)
+        return especie, instances, "classificador", None
+
+    if mode != "cascade" or conf < gray_zone_min or conf >= threshold:
+        route_counts["rejeitado"] += 1
+        return None
+
+    # ---- zona cinzenta: os dois detectores ao mesmo tempo
+    route_counts["ambos"] += 1
+    species = ("canino", "felino")
+    outputs = await asyncio.gather(*(run(s, image, tier) for s in species))
+
+    scores = {s: round(_best_score(inst), 3) for s, inst in zip(species, outputs)}
+    best = max(range(len(species)), key=lambda i: _best_score(outputs[i]))
+    return species[best], outputs[best], "ambos", scores
+
+
+def routing_stats():
+    mode, gray_zone_min = routing_config()
+    return {"mode": mode, "gray_zone_min": gray_zone_min, "routes": dict(route_counts)}
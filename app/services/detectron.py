@@ -1,20 +1,13 @@
-from detectron2.engine import DefaultPredictor
-from detectron2.config import get_cfg
 import cv2
-import os
 
+from app.registry import registry
 
-BASE_PATH = "models/detectron"
 
 def load_predictor(species: str):
-    cfg = get_cfg()
-    cfg.merge_from_file(os.path.join(BASE_PATH, species, f"inferencia_{species}.yaml"))
-    cfg.MODEL.WEIGHTS = os.path.join(BASE_PATH, species, f"model_final_{species}.pth")
-    cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.5
-    return DefaultPredictor(cfg)
+    return registry.get_predictor(species)
 
 
-# Inicializa os dois modelos uma vez
+# Os dois modelos vêm do registro compartilhado (carregados uma vez só)
 predictors = {
     "canino": load_predictor("canino"),
     "felino": load_predictor("felino")
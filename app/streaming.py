@@ -0,0 +1,219 @@
+import asyncio
+import time
+
+import cv2
+import numpy as np
+from fastapi import WebSocketDisconnect
+from fastapi.concurrency import run_in_threadpool
+
+from app.config import CFG
+from app.executor import DeadlineExceeded, QueueFull
+from app.metrics import render_counters
+
+# Frames por destino (GET /streaming e /metrics)
+frame_counts = {"recebidos": 0, "inferidos": 0, "reutilizados": 0, "descartados": 0, "recusados": 0}
+active_streams = 0
+
+
+def streaming_config():
+    cfg = CFG.get("streaming", {})
+    return {
+        "enabled": cfg.get("enabled", False),
+        "max_streams": cfg.get("max_streams", 4),
+        "signature_size": cfg.get("signature_size", 32),
+        "diff_threshold": cfg.get("diff_threshold", 3.0),
+        "max_reuse": cfg.get("max_reuse", 15),
+    }
+
+
+def frame_signature(image, size=32):
+    """
+    Assinatura barata do frame: miniatura size x size em tons de cinza.
+    """
+    small = cv2.resize(image, (size, size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+def frame_difference(a, b):
+    """
+    Diferença média absoluta (0-255) entre duas assinaturas.
+    """
+    return float(np.abs(a - b).mean())
+
+
+class FrameStream:
+    """
+    Uma conexão de streaming de frames (WebSocket).
+
+    O cliente envia frames codificados (JPEG/PNG) como mensagens binárias
+    e recebe um JSON por frame processado:
+
+    - latest-frame-wins: enquanto a inferência do frame atual roda, só o
+      frame mais recente fica guardado; os anteriores são descartados
+      (contados em `descartados` na resposta do frame que os substituiu);
+    - frames quase idênticos ao último inferido (diferença da miniatura
+      abaixo de `diff_threshold`) não passam pelos modelos: a resposta
+      reaproveita as detecções anteriores (`reutilizado: true`), no máximo
+      `max_reuse` vezes seguidas;
+    - a inferência passa pela mesma admissão e prazo do /predict: com o
+      executor cheio (ou o prazo vencido) o frame é recusado
+      (`status: "recusado"` / `"prazo_expirado"`) e a conexão continua.
+
+    Args:
+        decode: `decode(bytes)` -> (imagem, escala), roda no threadpool
+        infer: corrotina `infer(bytes, imagem, escala)` -> resultado do /predict
+    """
+
+    def __init__(self, websocket, decode, infer, signature_size=32, diff_threshold=3.0, max_reuse=15):
+        self.websocket = websocket
+        self.decode = decode
+        self.infer = infer
+        self.signature_size = signature_size
+        self.diff_threshold = diff_threshold
+        self.max_reuse = max_reuse
+
+        self._latest = None
+        self._ready = asyncio.Event()
+        self._closed = False
+        self._send_lock = asyncio.Lock()
+
+        self._received = 0
+        self._dropped = 0
+        self._last_signature = None
+        self._last_result = None
+        self._reused = 0
+
+    async def _send(self, message):
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def _receive(self):
+        try:
+            while True:
+                message = await self.websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+
+                data = message.get("bytes")
+                if data is None:
+                    await self._send({"status": "erro", "motivo": "Envie os frames como mensagens binárias"})
+                    continue
+
+                self._received += 1
+                frame_counts["recebidos"] += 1
+                if self._latest is not None:
+                    # ---- inferência atrasada: o frame anterior nunca será processado
+                    self._dropped += 1
+                    frame_counts["descartados"] += 1
+                self._latest = (self._received, data, time.perf_counter())
+                self._ready.set()
+        except WebSocketDisconnect:
+            pass
+        finally:
+            self._closed = True
+            self._ready.set()
+
+    def _prepare(self, data):
+        image, scale = self.decode(data)
+        return image, scale, frame_signature(image, self.signature_size)
+
+    def _can_reuse(self, signature):
+        if self._last_result is None or self._reused >= self.max_reuse:
+            return False
+        if signature.shape != self._last_signature.shape:
+            return False
+        return frame_difference(signature, self._last_signature) < self.diff_threshold
+
+    async def _process(self, seq, data, received):
+        image, scale, signature = await run_in_threadpool(self._prepare, data)
+
+        if self._can_reuse(signature):
+            self._reused += 1
+            frame_counts["reutilizados"] += 1
+            result, reused = self._last_result, True
+        else:
+            try:
+                result = await self.infer(data, image, scale)
+            except (QueueFull, DeadlineExceeded) as exc:
+                # ---- sem vaga no executor: o frame não é inferido nem vira referência
+                frame_counts["recusados"] += 1
+                status = "recusado" if isinstance(exc, QueueFull) else "prazo_expirado"
+                return {"frame": seq, "status": status, "motivo": str(exc), "descartados": self._dropped}
+            frame_counts["inferidos"] += 1
+            self._reused = 0
+            self._last_signature = signature
+            self._last_result = result
+            reused = False
+
+        return {
+            "frame": seq,
+            "reutilizado": reused,
+            "descartados": self._dropped,
+            "latencia_ms": round(1000 * (time.perf_counter() - received), 1),
+            **result
+        }
+
+    async def run(self):
+        receiver = asyncio.ensure_future(self._receive())
+        try:
+            while True:
+                await self._ready.wait()
+                self._ready.clear()
+
+                if self._latest is None:
+                    if self._closed:
+                        return
+                    continue
+
+                (seq, data, received), self._latest = self._latest, None
+                try:
+                    message = await self._process(seq, data, received)
+                except Exception as exc:
+                    message = {"frame": seq, "status": "erro", "motivo": str(exc)}
+                self._dropped = 0
+
+                if self._closed:
+                    return
+                await self._send(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiver.cancel()
+
+
+async def serve_stream(websocket, decode, infer):
+    """
+    Atende uma conexão de streaming (limitada a `streaming.max_streams` simultâneas).
+    """
+    global active_streams
+    cfg = streaming_config()
+
+    if not cfg["enabled"] or active_streams >= cfg["max_streams"]:
+        # ---- recusa no handshake (HTTP 403), antes de aceitar a conexão
+        reason = "Streaming desabilitado" if not cfg["enabled"] else "Limite de streams atingido"
+        await websocket.close(code=1013, reason=reason)
+        return
+
+    active_streams += 1
+    try:
+        await websocket.accept()
+        await FrameStream(
+            websocket, decode, infer,
+            signature_size=cfg["signature_size"],
+            diff_threshold=cfg["diff_threshold"],
+            max_reuse=cfg["max_reuse"]
+        ).run()
+    finally:
+        active_streams -= 1
+
+
+def streaming_stats():
+    return {**streaming_config(), "ativos": active_streams, "frames": dict(frame_counts)}
+
+
+def render_streaming_metrics():
+    return render_counters(
+        "liver_api_stream_frames_total",
+        "Frames recebidos pelo /stream, por destino",
+        [({"destino": name}, count) for name, count in frame_counts.items()]
+    )
@@ -0,0 +1,120 @@
+import copy
+
+from app.config import CFG
+
+# Campo do tier em configs/app.yaml -> chave da configuração do Detectron2
+TIER_FIELDS = {
+    "min_size": "INPUT.MIN_SIZE_TEST",
+    "max_size": "INPUT.MAX_SIZE_TEST",
+    "pre_nms_topk": "MODEL.RPN.PRE_NMS_TOPK_TEST",
+    "post_nms_topk": "MODEL.RPN.POST_NMS_TOPK_TEST",
+    "detections_per_image": "TEST.DETECTIONS_PER_IMAGE",
+    "score_thresh": "MODEL.ROI_HEADS.SCORE_THRESH_TEST",
+}
+
+
+def tier_names():
+    return [name for name in CFG.get("tiers", {}) if name != "default"]
+
+
+def resolve_tier(name=None):
+    """
+    Tier pedido (ou o padrão de configs/app.yaml). None = configuração base do modelo.
+
+    Raises:
+        ValueError: tier inexistente
+    """
+    name = name or CFG.get("tiers", {}).get("default")
+    if name is not None and name not in tier_names():
+        raise ValueError(f"Tier inválido: '{name}' (use {', '.join(tier_names())})")
+    return name
+
+
+def tier_settings(tier):
+    """
+    Valores do tier em configs/app.yaml, em ordem estável (None = configuração base).
+    """
+    return None if tier is None else sorted(CFG["tiers"][tier].items())
+
+
+def apply_tier_cfg(cfg, tier):
+    """
+    Cópia da configuração do Detectron2 com os valores do tier.
+    """
+    cfg = cfg.clone()
+    if tier is None:
+        return cfg
+
+    settings = CFG["tiers"][tier]
+    opts = []
+    for field, key in TIER_FIELDS.items():
+        if settings.get(field) is not None:
+            opts += [key, settings[field]]
+
+    cfg.defrost()
+    cfg.merge_from_list(opts)
+    return cfg
+
+
+def _shallow(module):
+    # cópia rasa de um nn.Module com dicionário de submódulos próprio
+    clone = copy.copy(module)
+    clone._modules = module._modules.copy()
+    return clone
+
+
+def tier_model(model, cfg):
+    """
+    Visão do GeneralizedRCNN com os limites de propostas/detecções do tier.
+
+    Só o RPN e o box predictor são copiados (cópia rasa): backbone, heads
+    e todos os pesos continuam sendo os mesmos tensores do modelo base.
+    """
+    view = _shallow(model)
+
+    rpn = copy.copy(model.proposal_generator)
+    rpn.pre_nms_topk = {True: rpn.pre_nms_topk[True], False: cfg.MODEL.RPN.PRE_NMS_TOPK_TEST}
+    rpn.post_nms_topk = {True: rpn.post_nms_topk[True], False: cfg.MODEL.RPN.POST_NMS_TOPK_TEST}
+    view._modules["proposal_generator"] = rpn
+
+    roi_heads = _shallow(model.roi_heads)
+    box_predictor = copy.copy(model.roi_heads.box_predictor)
+    box_predictor.test_topk_per_image = cfg.TEST.DETECTIONS_PER_IMAGE
+    box_predictor.test_score_thresh = cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST
+    roi_heads._modules["box_predictor"] = box_predictor
+    view._modules["roi_heads"] = roi_heads
+
+    return view
+
+
+def input_size(tier=None, species=("canino", "felino")):
+    """
+    Maior (min_size, max_size) dos detectores no tier: limite da
+    decodificação reduzida de JPEGs grandes. Carrega os predictors.
+    """
+    from app.registry import registry
+
+    predictors = [registry.get_predictor(s, tier) for s in species]
+    return (
+        max(p.cfg.INPUT.MIN_SIZE_TEST for p in predictors),
+        max(p.cfg.INPUT.MAX_SIZE_TEST for p in predictors)
+    )
+
+
+def tier_predictor(predictor, tier):
+    """
+    Predictor do tier compartilhando os pesos do predictor base.
+
+    Modelos exportados (TorchScript/ONNX) têm os limites de propostas
+    fixos no grafo; neles o tier muda apenas o tamanho de entrada.
+    """
+    import detectron2.data.transforms as T
+
+    view = copy.copy(predictor)
+    view.cfg = apply_tier_cfg(predictor.cfg, tier)
+    view.aug = T.ResizeShortestEdge(
+        [view.cfg.INPUT.MIN_SIZE_TEST, view.cfg.INPUT.MIN_SIZE_TEST], view.cfg.INPUT.MAX_SIZE_TEST
+    )
+    if not hasattr(predictor, "graph"):
+        view.model = tier_model(predictor.model, view.cfg)
+    return view
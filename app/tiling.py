@@ -0,0 +1,182 @@
+import asyncio
+
+import cv2
+import numpy as np
+import torch
+
+from app.batching import run_detection
+from app.config import CFG
+
+MERGE_MODES = ("nms", "wbf")
+
+
+def tiling_config():
+    cfg = CFG.get("tiling", {})
+    return {
+        "tile_size": cfg.get("tile_size", 800),
+        "overlap": cfg.get("overlap", 0.2),
+        "batch_size": cfg.get("batch_size", 4),
+        "parallel": cfg.get("parallel", 1),
+        "include_full": cfg.get("include_full", True),
+        "merge": cfg.get("merge", "wbf"),
+        "match_metric": cfg.get("match_metric", "ios"),
+        "match_threshold": cfg.get("match_threshold", 0.5),
+        "max_detections": cfg.get("max_detections", 100),
+    }
+
+
+def tile_grid(height, width, tile_size, overlap):
+    """
+    Janelas (x0, y0, x1, y1) de até `tile_size` px cobrindo a imagem, com
+    sobreposição `overlap` (fração do tile) entre vizinhas. A última
+    janela de cada eixo encosta na borda.
+    """
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        stride = max(1, int(tile_size * (1 - overlap)))
+        positions = list(range(0, length - tile_size, stride))
+        positions.append(length - tile_size)
+        return positions
+
+    return [
+        (x, y, min(x + tile_size, width), min(y + tile_size, height))
+        for y in starts(height)
+        for x in starts(width)
+    ]
+
+
+# ======================
+# Junção das detecções dos tiles
+# ======================
+def _overlap(box, boxes, metric):
+    """
+    Sobreposição de `box` com cada uma de `boxes`: IoU, ou "ios"
+    (interseção sobre a menor área), que junta a parte de um objeto
+    cortada pela borda do tile com a detecção completa.
+    """
+    lt = torch.max(box[:2], boxes[:, :2])
+    rb = torch.min(box[2:], boxes[:, 2:])
+    inter = (rb - lt).clamp(min=0).prod(dim=1)
+
+    area = (box[2:] - box[:2]).prod()
+    areas = (boxes[:, 2:] - boxes[:, :2]).prod(dim=1)
+    if metric == "ios":
+        denom = torch.min(areas, area)
+    else:
+        denom = areas + area - inter
+    return inter / denom.clamp(min=1e-6)
+
+
+def merge_detections(boxes, scores, classes, mode="wbf", metric="ios", threshold=0.5, max_detections=100):
+    """
+    Agrupa detecções sobrepostas da mesma classe (guloso, por score).
+
+    - "nms": fica a caixa de maior score do grupo;
+    - "wbf": caixa = média das caixas do grupo ponderada pelo score,
+      score = maior score do grupo.
+
+    Memória O(N): a sobreposição é calculada uma linha por vez.
+    """
+    if mode not in MERGE_MODES:
+        raise ValueError(f"Modo de junção inválido: '{mode}' (use {', '.join(MERGE_MODES)})")
+
+    order = scores.argsort(descending=True)
+    boxes, scores, classes = boxes[order], scores[order], classes[order]
+
+    free = torch.ones(len(boxes), dtype=torch.bool)
+    out_boxes, out_scores, out_classes = [], [], []
+    for i in range(len(boxes)):
+        if len(out_boxes) >= max_detections:
+            break
+        if not free[i]:
+            continue
+
+        members = free & (classes == classes[i]) & (_overlap(boxes[i], boxes, metric) >= threshold)
+        members[i] = True
+        free &= ~members
+
+        if mode == "wbf":
+            weights = scores[members]
+            out_boxes.append((boxes[members] * weights[:, None]).sum(dim=0) / weights.sum())
+        else:
+            out_boxes.append(boxes[i])
+        out_scores.append(scores[i])
+        out_classes.append(classes[i])
+
+    if not out_boxes:
+        return boxes[:0], scores[:0], classes[:0]
+    return torch.stack(out_boxes), torch.stack(out_scores), torch.stack(out_classes)
+
+
+# ======================
+# Detecção por tiles
+# ======================
+async def detect_tiled(species: str, image, tier: str = None):
+    """
+    Detecção em imagens de alta resolução por janelas deslizantes.
+
+    A imagem é dividida em tiles sobrepostos de `tiling.tile_size` px
+    (quase na resolução original, preservando estruturas pequenas como o
+    processo papilar). Os tiles vão ao modelo em lotes de
+    `tiling.batch_size` pelo executor de inferência, com até
+    `tiling.parallel` lotes ao mesmo tempo; só os tiles desses lotes são
+    copiados, então a memória do modelo não cresce com o tamanho da
+    imagem. A imagem decodificada em si fica limitada por
+    `ingestion.max_pixels` (ver `app.ingest.decode_for_inference`).
+    Com `include_full`, a imagem inteira reduzida também é avaliada, para
+    objetos grandes que nenhum tile contém por inteiro. As caixas voltam
+    às coordenadas globais e são unidas por NMS ou WBF.
+
+    Returns:
+        Instances: detecções na resolução de `image`, na CPU
+    """
+    from detectron2.structures import Boxes, Instances
+
+    cfg = tiling_config()
+    height, width = image.shape[:2]
+    windows = tile_grid(height, width, cfg["tile_size"], cfg["overlap"])
+    chunks = [windows[i:i + cfg["batch_size"]] for i in range(0, len(windows), cfg["batch_size"])]
+    slots = asyncio.Semaphore(cfg["parallel"])
+
+    async def run_chunk(chunk):
+        async with slots:
+            tiles = [np.ascontiguousarray(image[y0:y1, x0:x1]) for x0, y0, x1, y1 in chunk]
+            outputs = await run_detection(species, tiles, tier)
+        del tiles
+
+        parts = []
+        for (x0, y0, _, _), instances in zip(chunk, outputs):
+            offset = torch.tensor([x0, y0, x0, y0], dtype=instances.pred_boxes.tensor.dtype)
+            parts.append((instances.pred_boxes.tensor + offset, instances.scores, instances.pred_classes))
+        return parts
+
+    async def run_full():
+        # ---- visão geral reduzida (lado menor = tile_size)
+        factor = cfg["tile_size"] / min(height, width)
+        if factor >= 1:
+            small, factor = image, 1.0
+        else:
+            small = cv2.resize(image, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA)
+        async with slots:
+            instances, = await run_detection(species, [small], tier)
+        return [(instances.pred_boxes.tensor / factor, instances.scores, instances.pred_classes)]
+
+    jobs = [run_chunk(chunk) for chunk in chunks]
+    if cfg["include_full"] and len(windows) > 1:
+        jobs.append(run_full())
+
+    parts = [part for result in await asyncio.gather(*jobs) for part in result]
+    boxes, scores, classes = (torch.cat(t) for t in zip(*parts))
+
+    boxes, scores, classes = merge_detections(
+        boxes, scores, classes,
+        mode=cfg["merge"],
+        metric=cfg["match_metric"],
+        threshold=cfg["match_threshold"],
+        max_detections=cfg["max_detections"]
+    )
+    boxes[:, 0::2] = boxes[:, 0::2].clamp(0, width)
+    boxes[:, 1::2] = boxes[:, 1::2].clamp(0, height)
+
+    return Instances((height, width), pred_boxes=Boxes(boxes), scores=scores, pred_classes=classes)
@@ -0,0 +1,108 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+from app.metrics import LabeledHistogram
+
+STAGE_BUCKETS = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0]
+
+# Motivos de rejeição -> valor curto do label "resultado"
+REJECTION_LABELS = {
+    "Imagem não parece ser fígado de cão ou gato": "rejeitado_classificador",
+    "Não é fígado de cão ou gato": "rejeitado_classificador",  # /detectron/predict_auto
+    "Nenhuma estrutura hepática detectada": "rejeitado_sem_deteccao",
+    "Imagem não contém fígado": "rejeitado_classe",
+}
+
+stage_seconds = LabeledHistogram(
+    "liver_api_stage_seconds",
+    "Duração de cada etapa da predição",
+    ("endpoint", "stage", "especie", "resultado"),
+    STAGE_BUCKETS
+)
+
+# Timer da requisição atual (None fora de /predict e /detectron/predict_auto)
+_current = contextvars.ContextVar("stage_timer", default=None)
+
+
+class StageTimer:
+    """
+    Acumula a duração de cada etapa de uma requisição.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.especie = None
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def total(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self):
+        """
+        Valor do header Server-Timing (durações em ms).
+        """
+        parts = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        parts.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(parts)
+
+
+def start_timer():
+    timer = StageTimer()
+    _current.set(timer)
+    return timer
+
+
+@contextmanager
+def stage(name):
+    """
+    Mede uma etapa no timer da requisição atual (sem timer, não faz nada).
+    """
+    timer = _current.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def set_species(especie):
+    """
+    Espécie do detector usado (label dos histogramas, inclusive nas rejeições).
+    """
+    timer = _current.get()
+    if timer is not None:
+        timer.especie = especie
+
+
+def outcome_label(result):
+    # ok | rejeitado_* | recusado (fila cheia) | prazo_expirado | invalido | erro
+    status = result.get("status", "erro")
+    if status == "rejeitado":
+        return REJECTION_LABELS.get(result.get("motivo"), "rejeitado")
+    return status
+
+
+def finish_timer(timer, endpoint, result, response=None):
+    """
+    Registra as etapas nos histogramas (por espécie e resultado) e
+    devolve as durações no header Server-Timing.
+    """
+    total = timer.total()
+    especie = result.get("especie") or timer.especie or "nenhuma"
+    outcome = outcome_label(result)
+
+    for name, seconds in timer.stages.items():
+        stage_seconds.observe(seconds, endpoint, name, especie, outcome)
+    stage_seconds.observe(total, endpoint, "total", especie, outcome)
+
+    if response is not None:
+        response.headers["Server-Timing"] = timer.server_timing()
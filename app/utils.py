@@ -31,17 +31,47 @@ import cv2
 import os
 
 
+def draw_detections(img, detections):
+    """
+    Desenha bounding boxes e labels (in-place) a partir das detecções no
+    formato da resposta da API ({"classe", "score", "bbox"})
+    """
+    for det in detections:
+        text = f"{det['classe']} {det['score']:.2f}"
+
+        x1, y1, x2, y2 = map(int, det["bbox"])
+
+        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
+        cv2.putText(
+            img,
+            text,
+            (x1, max(y1 - 10, 10)),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.6,
+            (0, 255, 0),
+            2
+        )
+    return img
+
+
 def save_annotated_image(
     image,
     instances,
     especie,
     class_names,
-    output_dir="outputs"
+    output_dir="outputs",
+    filename=None
 ):
     """
     Salva imagem anotada com bounding boxes e labels
+
+    `image` pode ser o buffer BGR da ingestão (np.ndarray, copiado uma
+    única vez para o desenho) ou uma imagem PIL RGB.
     """
-    img = np.array(image).copy()
+    if isinstance(image, np.ndarray):
+        img = image.copy()
+    else:
+        img = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
 
     boxes = instances.pred_boxes.tensor.numpy()
     scores = instances.scores.numpy()
@@ -50,66 +80,31 @@ def save_annotated_image(
     save_dir = os.path.join(output_dir, especie)
     os.makedirs(save_dir, exist_ok=True)
 
-    for box, score, cls in zip(boxes, scores, classes):
-        cls_id = int(cls)
-        label = class_names[especie].get(cls_id, "desconhecida")
-        text = f"{label} {score:.2f}"
-
-        x1, y1, x2, y2 = map(int, box)
-
-        cv2.rectangle(img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-        cv2.putText(
-            img,
-            text,
-            (x1, max(y1 - 10, 10)),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            0.6,
-            (0, 255, 0),
-            2
-        )
+    draw_detections(img, [
+        {
+            "classe": class_names[especie].get(int(cls), "desconhecida"),
+            "score": float(score),
+            "bbox": box
+        }
+        for box, score, cls in zip(boxes, scores, classes)
+    ])
 
-    filename = f"resultado_{os.getpid()}_{np.random.randint(10000)}.jpg"
+    if filename is None:
+        filename = f"resultado_{os.getpid()}_{np.random.randint(10000)}.jpg"
     path = os.path.join(save_dir, filename)
 
-    cv2.imwrite(path, cv2.cvtColor(img, cv2.COLOR_RGB2BGR))
+    cv2.imwrite(path, img)
 
     return path
 
 # ---- logging utilities
-import json
-import csv
-from datetime import datetime
-import os
-
-
-LOG_DIR = "logs"
-CSV_PATH = os.path.join(LOG_DIR, "predictions.csv")
-JSONL_PATH = os.path.join(LOG_DIR, "predictions.jsonl")
-
-
 def log_prediction(data: dict):
-    os.makedirs(LOG_DIR, exist_ok=True)
-
-    data["timestamp"] = datetime.now().isoformat()
-
-    # ---- JSONL (1 linha = 1 predição)
-    with open(JSONL_PATH, "a", encoding="utf-8") as f:
-        f.write(json.dumps(data, ensure_ascii=False) + "\n")
-
-    # ---- CSV (resumo)
-    csv_row = {
-        "timestamp": data["timestamp"],
-        "status": data.get("status"),
-        "especie": data.get("especie"),
-        "confidence_especie": data.get("confidence_especie"),
-        "num_instancias": data.get("num_instancias"),
-        "motivo": data.get("motivo"),
-    }
-
-    write_header = not os.path.exists(CSV_PATH)
-
-    with open(CSV_PATH, "a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=csv_row.keys())
-        if write_header:
-            writer.writeheader()
-        writer.writerow(csv_row)
+    """
+    Registra uma predição no log em lote (ver app/prediction_log.py).
+    Não faz nada se `logging.enabled` for falso em configs/app.yaml.
+    """
+    from app.prediction_log import get_prediction_logger
+
+    logger = get_prediction_logger()
+    if logger is not None:
+        logger.log(data)
@@ -0,0 +1,130 @@
+import os
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# ======================
+# Inicialização dos processos de inferência
+# ======================
+def init_worker(counter, torch_threads=None, pin_cores=False, cores_per_worker=None, max_workers=1):
+    """
+    Inicializa um processo do pool: fixa o processo numa fatia dos núcleos
+    disponíveis (um worker por fatia) e ajusta as threads do torch ao
+    tamanho da fatia.
+
+    Args:
+        counter (multiprocessing.Value): contador compartilhado que numera os workers
+    """
+    with counter.get_lock():
+        index = counter.value
+        counter.value += 1
+
+    cores = None
+    if pin_cores and hasattr(os, "sched_setaffinity"):
+        cpus = sorted(os.sched_getaffinity(0))
+        per_worker = cores_per_worker or max(1, len(cpus) // max_workers)
+        start = (index * per_worker) % len(cpus)
+        cores = cpus[start:start + per_worker] or cpus[:per_worker]
+        os.sched_setaffinity(0, cores)
+
+    threads = torch_threads or (len(cores) if cores else None)
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+
+# ======================
+# Imagens em memória compartilhada
+# ======================
+class SharedImages:
+    """
+    Copia um lote de imagens (arrays uint8 HxWx3) para um único bloco de
+    `multiprocessing.shared_memory`; o worker recebe só o nome do bloco e
+    os offsets/shapes, sem serializar os pixels.
+
+    Uso (no processo da API):
+        with SharedImages(images) as packed:
+            result = pool.submit(fn, packed)
+    """
+
+    def __init__(self, images):
+        self.images = images
+        self._shm = None
+
+    def __enter__(self):
+        arrays = [np.ascontiguousarray(img) for img in self.images]
+        total = sum(a.nbytes for a in arrays)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(total, 1))
+
+        layout = []
+        offset = 0
+        for a in arrays:
+            np.ndarray(a.shape, dtype=a.dtype, buffer=self._shm.buf, offset=offset)[...] = a
+            layout.append((offset, a.shape, a.dtype.str))
+            offset += a.nbytes
+
+        return self._shm.name, layout
+
+    def __exit__(self, *exc):
+        self._shm.close()
+        self._shm.unlink()
+        return False
+
+
+def _attach(name):
+    try:
+        # Python 3.13+: quem criou o bloco é quem o remove
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+def call_attached(fn, packed, *args):
+    """
+    Roda no worker: abre o bloco compartilhado, monta views das imagens
+    (sem cópia) e chama `fn(imagens, *args)`.
+    """
+    name, layout = packed
+    shm = _attach(name)
+    images = [
+        np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+        for offset, shape, dtype in layout
+    ]
+    try:
+        return fn(images, *args)
+    finally:
+        images.clear()
+        try:
+            shm.close()
+        except BufferError:
+            pass  # ainda há views vivas (ex.: no traceback de uma exceção); o GC fecha depois
+
+
+# ======================
+# Resultado compacto do Detectron2
+# ======================
+def to_compact(instances):
+    """
+    Instances -> arrays numpy (caixas, scores, classes) + tamanho da imagem.
+    Bem menor para voltar do worker do que o objeto Instances serializado.
+    """
+    return (
+        tuple(instances.image_size),
+        instances.pred_boxes.tensor.numpy().astype(np.float32, copy=False),
+        instances.scores.numpy().astype(np.float32, copy=False),
+        instances.pred_classes.numpy().astype(np.int32, copy=False),
+    )
+
+
+def from_compact(compact):
+    import torch
+    from detectron2.structures import Boxes, Instances
+
+    image_size, boxes, scores, classes = compact
+    return Instances(
+        image_size,
+        pred_boxes=Boxes(torch.from_numpy(boxes)),
+        scores=torch.from_numpy(scores),
+        pred_classes=torch.from_numpy(classes).long()
+    )
@@ -3,6 +3,8 @@ import requests
 from PIL import Image
 import io
 
+API_URL = "http://127.0.0.1:8000"
+
 st.set_page_config(page_title="Detecção de Fígado", layout="centered")
 
 st.title("Detecção de Fígado Canino/Felino 🐶🐱")
@@ -17,7 +19,7 @@ if uploaded_file is not None:
     # Enviar para a API
     files = {"file": (uploaded_file.name, uploaded_file, "image/jpeg")}
     try:
-        response = requests.post("http://127.0.0.1:8000/detectron/predict_auto", files=files)
+        response = requests.post(f"{API_URL}/detectron/predict_auto", files=files)
         response.raise_for_status()
         data = response.json()
     except requests.exceptions.RequestException as e:
@@ -33,7 +35,14 @@ if uploaded_file is not None:
             for det in data["deteccoes"]:
                 st.write(f"- {det['classe']} | Score: {det['score']} | BBox: {det['bbox']}")
 
-            # Mostrar imagem anotada
-            annotated_path = data["imagem_anotada"]
-            annotated_img = Image.open(annotated_path)
-            st.image(annotated_img, caption="Imagem anotada", use_column_width=True)
+            # Mostrar imagem anotada (renderizada pela API sob demanda)
+            anotacao = data.get("anotacao")
+            if anotacao:
+                try:
+                    resp = requests.get(f"{API_URL}{anotacao['url']}", params={"max_size": 1280})
+                    resp.raise_for_status()
+                except requests.exceptions.RequestException as e:
+                    st.error(f"Erro ao obter imagem anotada: {e}")
+                else:
+                    annotated_img = Image.open(io.BytesIO(resp.content))
+                    st.image(annotated_img, caption="Imagem anotada", use_column_width=True)
@@ -0,0 +1,6 @@
+"""
+Benchmark da API em processo (sem servidor HTTP), com imagens sintéticas.
+
+Uso:
+    python -m benchmarks.run --models stub --resolutions 640x480 1920x1080 4000x3000
+"""
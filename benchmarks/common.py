@@ -0,0 +1,35 @@
+"""
+Partes comuns a benchmarks/run.py e benchmarks/load.py.
+
+Só biblioteca padrão: o gerador de carga roda numa máquina cliente sem
+numpy/cv2/torch.
+"""
+import math
+
+ENDPOINTS = {
+    "predict": "/predict",
+    "predict_auto": "/detectron/predict_auto",
+}
+
+
+def _percentile(ordered, q):
+    # interpolação linear entre vizinhos (mesmo resultado do np.percentile)
+    pos = (len(ordered) - 1) * q / 100
+    lo = math.floor(pos)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (pos - lo)
+
+
+def percentiles(values):
+    """
+    p50/p95/p99 e média, em ms, de latências em segundos.
+    """
+    if not values:
+        return {"p50": None, "p95": None, "p99": None, "mean": None}
+    ordered = sorted(v * 1000 for v in values)
+    return {
+        "p50": round(_percentile(ordered, 50), 2),
+        "p95": round(_percentile(ordered, 95), 2),
+        "p99": round(_percentile(ordered, 99), 2),
+        "mean": round(sum(ordered) / len(ordered), 2)
+    }
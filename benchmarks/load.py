@@ -0,0 +1,360 @@
+"""
+Gerador de carga contra uma instância da API já rodando (uvicorn ou
+scripts/serve_preload.py).
+
+Modos:
+    closed  N clientes simultâneos, cada um envia a próxima requisição ao
+            receber a resposta (--concurrency 10 50 200: uma fase por valor)
+    open    chegadas a uma taxa fixa, independente das respostas
+            (--rate 5 20 50: uma fase por valor, em req/s)
+    replay  reproduz um log de predições (logs/predictions.jsonl) com os
+            intervalos originais entre requisições (--speed acelera)
+
+Relatório: latência, erros, vazão e fila do executor ao longo do tempo,
+além da RSS/PSS do servidor e dos seus workers (--pid, Linux).
+
+Uso:
+    python -m benchmarks.load --images dataset_figado/test/canino --mode closed --concurrency 10 50 200 --pid 1234
+    python -m benchmarks.load --images imgs/ --mode open --rate 10 --duration 120
+    python -m benchmarks.load --images imgs/ --replay logs/predictions.jsonl --speed 5
+
+Requer `httpx`.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from benchmarks.common import ENDPOINTS, percentiles
+from scripts.measure_worker_memory import children_of, smaps_rollup
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(description="Gerador de carga da API")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", default="predict", choices=list(ENDPOINTS))
+    parser.add_argument("--annotate", default=None, choices=["none", "lazy", "async", "sync"])
+    parser.add_argument("--images", required=True, help="Pasta de imagens enviadas (ou referenciadas pelo log)")
+    parser.add_argument("--mode", default="closed", choices=["closed", "open"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--rate", type=float, nargs="+", default=[10.0], help="req/s no modo open")
+    parser.add_argument("--poisson", action="store_true", help="Chegadas Poisson no modo open (padrão: intervalo fixo)")
+    parser.add_argument("--duration", type=float, default=60.0, help="Segundos por fase")
+    parser.add_argument("--replay", default=None, help="Log de predições (JSONL) a reproduzir")
+    parser.add_argument("--speed", type=float, default=1.0, help="Aceleração do replay")
+    parser.add_argument("--max-outstanding", type=int, default=1000,
+                        help="Limite de requisições pendentes no cliente (open/replay)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--pid", type=int, default=None, help="PID do servidor (RSS do processo e dos filhos)")
+    parser.add_argument("--interval", type=float, default=1.0, help="Intervalo da linha do tempo (s)")
+    parser.add_argument("--out", default=None, help="Prefixo do relatório (padrão: results/load/<data>)")
+    return parser.parse_args()
+
+
+# ======================
+# FONTES DE REQUISIÇÕES
+# ======================
+def load_images(folder):
+    images = {}
+    for name in sorted(os.listdir(folder)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            with open(os.path.join(folder, name), "rb") as f:
+                images[name] = f.read()
+    if not images:
+        sys.exit(f"Nenhuma imagem em {folder}")
+    return images
+
+
+def load_replay(path, images, speed):
+    """
+    Lista de (instante relativo em s, endpoint, nome, bytes) a partir do log
+    de predições. Arquivos que não estão em --images são trocados pelas
+    imagens disponíveis, em ordem.
+    """
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                r = json.loads(line)
+                ts = datetime.fromisoformat(r["timestamp"]).timestamp()
+            except (ValueError, KeyError):
+                continue
+            endpoint = r.get("endpoint", "/predict")
+            if endpoint not in ENDPOINTS.values():
+                continue  # /predict_batch e outros ficam de fora
+            records.append((ts, endpoint, r.get("arquivo") or ""))
+
+    if not records:
+        sys.exit(f"Nenhuma requisição reproduzível em {path}")
+
+    records.sort()
+    names = list(images)
+    t0 = records[0][0]
+    schedule = []
+    for i, (ts, endpoint, name) in enumerate(records):
+        name = os.path.basename(name)
+        if name not in images:
+            name = names[i % len(names)]
+        schedule.append(((ts - t0) / speed, endpoint, name, images[name]))
+    return schedule
+
+
+# ======================
+# CLIENTE
+# ======================
+class Recorder:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.samples = []   # (fase, início, latência, código, status)
+        self.timeline = []  # amostras do monitor
+        self.dropped = 0
+
+    def now(self):
+        return time.perf_counter() - self.t0
+
+
+async def send(client, recorder, phase, path, name, data, annotate):
+    params = {"annotate": annotate} if annotate else {}
+    start = recorder.now()
+    try:
+        resp = await client.post(path, params=params, files={"file": (name, data, "image/jpeg")})
+        code = resp.status_code
+        status = resp.json().get("status") if code == 200 else None
+    except Exception as exc:
+        code, status = type(exc).__name__, None
+    recorder.samples.append((phase, start, recorder.now() - start, code, status))
+
+
+async def closed_loop(client, recorder, args, images, concurrency):
+    phase = f"closed-{concurrency}"
+    path = ENDPOINTS[args.endpoint]
+    names = list(images)
+    deadline = recorder.now() + args.duration
+
+    async def worker(offset):
+        i = offset
+        while recorder.now() < deadline:
+            name = names[i % len(names)]
+            await send(client, recorder, phase, path, name, images[name], args.annotate)
+            i += concurrency
+
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+
+
+async def _open_loop(client, recorder, args, phase, arrivals):
+    """
+    Dispara cada requisição no seu instante, sem esperar as anteriores.
+    """
+    pending = set()
+    start = recorder.now()
+    for offset, path, name, data in arrivals:
+        delay = start + offset - recorder.now()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(pending) >= args.max_outstanding:
+            recorder.dropped += 1
+            continue
+        task = asyncio.ensure_future(send(client, recorder, phase, path, name, data, args.annotate))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending)
+
+
+def open_arrivals(args, images, rate):
+    path = ENDPOINTS[args.endpoint]
+    names = list(images)
+    t, i = 0.0, 0
+    while t < args.duration:
+        name = names[i % len(names)]
+        yield t, path, name, images[name]
+        t += random.expovariate(rate) if args.poisson else 1.0 / rate
+        i += 1
+
+
+# ======================
+# MONITOR (fila do servidor + memória)
+# ======================
+def memory_sample(pid):
+    pids = [pid] + children_of(pid)
+    rss = pss = 0
+    for p in pids:
+        try:
+            m = smaps_rollup(p)
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+        rss += m.get("Rss", 0)
+        pss += m.get("Pss", 0)
+    return {"processes": len(pids), "rss_mb": round(rss / 2 ** 20, 1), "pss_mb": round(pss / 2 ** 20, 1)}
+
+
+async def monitor(client, recorder, args, stop):
+    while not stop.is_set():
+        sample = {"t": round(recorder.now(), 2)}
+        try:
+            resp = await client.get("/", timeout=2.0)
+            executor = resp.json().get("executor", {})
+            sample["in_flight"] = executor.get("in_flight")
+            sample["waiting"] = executor.get("waiting")
+        except Exception:
+            sample["in_flight"] = sample["waiting"] = None
+        if args.pid:
+            sample.update(memory_sample(args.pid))
+        recorder.timeline.append(sample)
+
+        try:
+            await asyncio.wait_for(stop.wait(), args.interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+# ======================
+# RELATÓRIO
+# ======================
+def summarize(samples, duration):
+    ok = [s for s in samples if s[3] == 200]
+    errors = {}
+    for s in samples:
+        if s[3] != 200:
+            errors[str(s[3])] = errors.get(str(s[3]), 0) + 1
+    statuses = {}
+    for s in ok:
+        statuses[s[4] or "?"] = statuses.get(s[4] or "?", 0) + 1
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(ok) / duration, 2) if duration else None,
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else None,
+        "errors": errors,
+        "statuses": statuses,
+        "latency_ms": percentiles([s[2] for s in ok])
+    }
+
+
+def build_timeline(recorder, interval):
+    """
+    Uma linha por intervalo: requisições concluídas, erros, latência e
+    a amostra do monitor mais próxima.
+    """
+    end = max([s[1] + s[2] for s in recorder.samples] + [t["t"] for t in recorder.timeline] + [0])
+    rows = []
+    for k in range(int(end // interval) + 1):
+        lo, hi = k * interval, (k + 1) * interval
+        done = [s for s in recorder.samples if lo <= s[1] + s[2] < hi]
+        lat = percentiles([s[2] for s in done if s[3] == 200])
+        mon = [t for t in recorder.timeline if lo <= t["t"] < hi]
+        row = {
+            "t": round(lo, 2),
+            "phase": done[-1][0] if done else None,
+            "completed": len(done),
+            "errors": sum(s[3] != 200 for s in done),
+            "p50_ms": lat["p50"],
+            "p95_ms": lat["p95"],
+            "p99_ms": lat["p99"],
+        }
+        if mon:
+            row.update({k2: v for k2, v in mon[-1].items() if k2 != "t"})
+        rows.append(row)
+    return rows
+
+
+def print_summary(phases):
+    print(f"\n{'fase':<16}{'req':>7}{'req/s':>9}{'erros':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for name, s in phases.items():
+        lat = {k: "-" if v is None else v for k, v in s["latency_ms"].items()}
+        error_rate = "-" if s["error_rate"] is None else s["error_rate"]
+        print(
+            f"{name:<16}{s['requests']:>7}{s['throughput_rps']:>9}{error_rate:>8}"
+            f"{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}"
+        )
+
+
+# ======================
+# MAIN
+# ======================
+async def run(args):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("O gerador de carga requer httpx: pip install httpx")
+
+    images = load_images(args.images)
+    recorder = Recorder()
+    stop = asyncio.Event()
+    phases = {}
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        mon = asyncio.ensure_future(monitor(client, recorder, args, stop))
+        try:
+            if args.replay:
+                schedule = load_replay(args.replay, images, args.speed)
+                start = recorder.now()
+                await _open_loop(client, recorder, args, "replay", schedule)
+                phases["replay"] = recorder.now() - start
+            elif args.mode == "closed":
+                for c in args.concurrency:
+                    print(f"▶️  closed loop, {c} clientes, {args.duration:.0f}s", flush=True)
+                    start = recorder.now()
+                    await closed_loop(client, recorder, args, images, c)
+                    phases[f"closed-{c}"] = recorder.now() - start
+            else:
+                for rate in args.rate:
+                    print(f"▶️  open loop, {rate} req/s, {args.duration:.0f}s", flush=True)
+                    start = recorder.now()
+                    await _open_loop(client, recorder, args, f"open-{rate:g}", open_arrivals(args, images, rate))
+                    phases[f"open-{rate:g}"] = recorder.now() - start
+        finally:
+            stop.set()
+            await mon
+
+    return recorder, phases
+
+
+def main():
+    args = parse_args()
+    recorder, durations = asyncio.run(run(args))
+
+    phases = {
+        name: summarize([s for s in recorder.samples if s[0] == name], duration)
+        for name, duration in durations.items()
+    }
+    timeline = build_timeline(recorder, args.interval)
+
+    prefix = args.out or os.path.join("results", "load", time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(os.path.dirname(prefix) or ".", exist_ok=True)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "params": {k: v for k, v in vars(args).items()},
+        "client_dropped": recorder.dropped,
+        "phases": phases,
+        "timeline": timeline
+    }
+    with open(prefix + ".json", "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    fields = sorted({k for row in timeline for k in row}, key=lambda k: (k != "t", k != "phase", k))
+    with open(prefix + "_timeline.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(timeline)
+
+    print_summary(phases)
+    if recorder.dropped:
+        print(f"⚠️ {recorder.dropped} requisições descartadas no cliente (--max-outstanding)")
+    print(f"\n✔ Relatório: {prefix}.json")
+    print(f"✔ Linha do tempo (latência, fila, RSS): {prefix}_timeline.csv")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""
+Benchmark de /predict e /detectron/predict_auto com a API rodando no
+próprio processo (ASGI, sem rede), em imagens sintéticas de várias
+resoluções.
+
+Mede vazão, latência (p50/p95/p99) por endpoint e resolução e a
+latência de cada etapa (header Server-Timing). O resultado vai para
+um JSON que pode ser comparado com uma execução anterior (--compare).
+
+Modelos:
+    --models stub  pesos aleatórios com a arquitetura real (não precisa de download)
+    --models real  pesos de configs/app.yaml
+    --models auto  real se todos os pesos existirem, senão stub
+
+Uso:
+    python -m benchmarks.run --models stub --requests 50 --concurrency 4
+    python -m benchmarks.run --out results/bench/novo.json --compare results/bench/base.json
+
+Requer `httpx` (cliente ASGI).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import yaml
+
+from benchmarks.common import ENDPOINTS, percentiles
+from benchmarks.stub_models import build_stub_models, real_weights_present
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark da API em processo")
+    parser.add_argument("--models", default="auto", choices=["auto", "stub", "real"])
+    parser.add_argument("--config", default="configs/app.yaml", help="Configuração base da API")
+    parser.add_argument("--resolutions", nargs="+", default=["640x480", "1920x1080", "4000x3000"])
+    parser.add_argument("--endpoints", nargs="+", default=list(ENDPOINTS), choices=list(ENDPOINTS))
+    parser.add_argument("--requests", type=int, default=30, help="Requisições medidas por endpoint/resolução")
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--annotate", default="none", choices=["none", "lazy", "async", "sync"])
+    parser.add_argument("--stub-confidence", type=float, default=0.98,
+                        help="Confiança do classificador stub (abaixo do threshold testa a zona cinzenta)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="JSON de saída (padrão: results/bench/<data>.json)")
+    parser.add_argument("--compare", default=None, help="JSON de uma execução anterior")
+    return parser.parse_args()
+
+
+# ======================
+# PREPARAÇÃO
+# ======================
+def prepare_config(args, work_dir):
+    """
+    Escreve a configuração do benchmark e a ativa via APP_CONFIG
+    (antes de importar `app`). Cache, log, profiling e jobs ficam
+    desligados para que toda requisição passe pelos modelos.
+    """
+    with open(args.config) as f:
+        cfg = yaml.safe_load(f) or {}
+
+    models = args.models
+    if models == "auto":
+        models = "real" if real_weights_present(cfg) else "stub"
+    if models == "stub":
+        print("⚙️  Gerando modelos stub (pesos aleatórios, arquitetura real)...")
+        cfg = build_stub_models(os.path.join(work_dir, "models"), cfg, args.stub_confidence, args.seed)
+
+    cfg["cache"] = {**cfg.get("cache", {}), "enabled": False}
+    cfg["logging"] = {**cfg.get("logging", {}), "enabled": False}
+    cfg["profiling"] = {**cfg.get("profiling", {}), "enabled": False}
+    cfg["jobs"] = {**cfg.get("jobs", {}), "enabled": False}
+    cfg["annotation"] = {
+        **cfg.get("annotation", {}),
+        "output_dir": os.path.join(work_dir, "outputs"),
+        "store_dir": os.path.join(work_dir, "uploads")
+    }
+
+    path = os.path.join(work_dir, "app.yaml")
+    with open(path, "w") as f:
+        yaml.safe_dump(cfg, f, allow_unicode=True)
+    os.environ["APP_CONFIG"] = path
+    return models, cfg
+
+
+def synthetic_jpeg(width, height, seed=0, quality=90):
+    """
+    JPEG sintético com gradiente, formas e ruído (comprime como uma foto,
+    não como uma imagem lisa).
+    """
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.stack([x + 0 * y, y + 0 * x, (x + y) / 2], axis=2)
+
+    for _ in range(12):
+        cx, cy = int(rng.integers(0, width)), int(rng.integers(0, height))
+        r = int(rng.integers(min(width, height) // 20, min(width, height) // 4))
+        cv2.circle(img, (cx, cy), r, rng.integers(0, 256, 3).tolist(), -1)
+
+    img += rng.normal(0, 12, img.shape).astype(np.float32)
+    img = np.clip(img, 0, 255).astype(np.uint8)
+    ok, buf = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    return buf.tobytes()
+
+
+def parse_resolution(text):
+    w, h = text.lower().split("x")
+    return int(w), int(h)
+
+
+# ======================
+# MEDIÇÃO
+# ======================
+def parse_server_timing(header):
+    stages = {}
+    for part in (header or "").split(","):
+        name, _, rest = part.strip().partition(";dur=")
+        if name and rest:
+            stages[name] = float(rest) / 1000
+    return stages
+
+
+async def run_case(client, path, image, args):
+    """
+    `--requests` requisições com `--concurrency` clientes simultâneos.
+    """
+    params = {"annotate": args.annotate}
+
+    async def call():
+        start = time.perf_counter()
+        resp = await client.post(path, params=params, files={"file": ("bench.jpg", image, "image/jpeg")})
+        latency = time.perf_counter() - start
+        body = resp.json() if resp.status_code == 200 else {}
+        return latency, resp.status_code, body.get("status"), parse_server_timing(resp.headers.get("server-timing"))
+
+    for _ in range(args.warmup):
+        await call()
+
+    queue = asyncio.Queue()
+    for _ in range(args.requests):
+        queue.put_nowait(None)
+    samples = []
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            samples.append(await call())
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+
+    stage_names = sorted({name for s in samples for name in s[3]})
+    outcomes = {}
+    for _, code, status, _ in samples:
+        key = status or f"http_{code}"
+        outcomes[key] = outcomes.get(key, 0) + 1
+
+    return {
+        "requests": len(samples),
+        "concurrency": args.concurrency,
+        "throughput_rps": round(len(samples) / elapsed, 2),
+        "latency_ms": percentiles([s[0] for s in samples]),
+        "stages_ms": {
+            name: percentiles([s[3][name] for s in samples if name in s[3]])
+            for name in stage_names
+        },
+        "outcomes": outcomes
+    }
+
+
+async def run_all(args, images):
+    try:
+        import httpx
+    except ImportError:
+        sys.exit("O benchmark requer httpx: pip install httpx")
+
+    from app.main import app
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for endpoint in args.endpoints:
+                for resolution, image in images.items():
+                    print(f"▶️  {ENDPOINTS[endpoint]} @ {resolution} ...", flush=True)
+                    case = await run_case(client, ENDPOINTS[endpoint], image, args)
+                    results.append({"endpoint": ENDPOINTS[endpoint], "resolution": resolution, **case})
+    return results
+
+
+# ======================
+# RELATÓRIO
+# ======================
+def environment(models):
+    import torch
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+
+    return {
+        "commit": commit,
+        "models": models,
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "torch_threads": torch.get_num_threads(),
+        "cpu_count": os.cpu_count(),
+        "platform": platform.platform()
+    }
+
+
+def print_results(results):
+    print(f"\n{'endpoint':<26}{'resolução':>12}{'req/s':>9}{'p50':>9}{'p95':>9}{'p99':>9}  etapas (p50 ms)")
+    for r in results:
+        lat = r["latency_ms"]
+        stages = ", ".join(
+            f"{k}={v['p50']}" for k, v in r["stages_ms"].items() if k != "total"
+        )
+        print(
+            f"{r['endpoint']:<26}{r['resolution']:>12}{r['throughput_rps']:>9}"
+            f"{lat['p50']:>9}{lat['p95']:>9}{lat['p99']:>9}  {stages}"
+        )
+
+
+def print_comparison(results, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    base = {(r["endpoint"], r["resolution"]): r for r in baseline["results"]}
+
+    print(f"\n📊 Comparação com {baseline_path} ({baseline['environment'].get('commit')})")
+    print(f"{'endpoint':<26}{'resolução':>12}{'Δ req/s':>10}{'Δ p50 %':>10}{'Δ p95 %':>10}")
+    for r in results:
+        b = base.get((r["endpoint"], r["resolution"]))
+        if b is None:
+            continue
+
+        def pct(key):
+            old, new = b["latency_ms"][key], r["latency_ms"][key]
+            return f"{100 * (new - old) / old:+.1f}" if old else "-"
+
+        print(
+            f"{r['endpoint']:<26}{r['resolution']:>12}"
+            f"{r['throughput_rps'] - b['throughput_rps']:>+10.2f}{pct('p50'):>10}{pct('p95'):>10}"
+        )
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    models, _ = prepare_config(args, work_dir)
+
+    images = {
+        res: synthetic_jpeg(*parse_resolution(res), seed=args.seed)
+        for res in args.resolutions
+    }
+
+    results = asyncio.run(run_all(args, images))
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "environment": environment(models),
+        "params": {
+            "requests": args.requests,
+            "warmup": args.warmup,
+            "concurrency": args.concurrency,
+            "annotate": args.annotate,
+            "stub_confidence": args.stub_confidence if models == "stub" else None
+        },
+        "results": results
+    }
+
+    out = args.out or os.path.join("results", "bench", time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print_results(results)
+    if args.compare:
+        print_comparison(results, args.compare)
+    print(f"\n✔ Resultados: {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Modelos com a mesma arquitetura dos reais, inicializados aleatoriamente,
+para rodar o benchmark sem os pesos do Google Drive (CI / offline).
+
+Os vieses das camadas finais são ajustados para que o pipeline inteiro
+seja exercitado: o classificador devolve a confiança pedida e os
+detectores produzem caixas acima do threshold.
+"""
+import math
+import os
+
+import torch
+
+SPECIES = ("canino", "felino")
+
+
+def _logit(p):
+    p = min(max(p, 1e-4), 1 - 1e-4)
+    return math.log(p / (1 - p))
+
+
+def build_stub_classifier(path, confidence=0.98, seed=0):
+    """
+    SimpleCNN aleatório cuja saída é "canino" com a confiança pedida.
+    """
+    from app.classifier import SimpleCNN
+
+    torch.manual_seed(seed)
+    model = SimpleCNN().eval()
+    with torch.no_grad():
+        model.classifier.weight.zero_()
+        model.classifier.bias.copy_(torch.tensor([_logit(confidence), 0.0]))
+
+    torch.save(model, path)
+    return path
+
+
+def build_stub_detector(yaml_path, path, seed=0):
+    """
+    Faster R-CNN com a configuração da espécie e pesos aleatórios,
+    salvo no formato de checkpoint do Detectron2 ({"model": state_dict}).
+    """
+    from detectron2.config import get_cfg
+    from detectron2.modeling import build_model
+
+    torch.manual_seed(seed)
+    cfg = get_cfg()
+    cfg.merge_from_file(yaml_path)
+    cfg.MODEL.DEVICE = "cpu"
+    model = build_model(cfg).eval()
+
+    # classe 0 (fígado) com score alto para qualquer proposta
+    with torch.no_grad():
+        cls_score = model.roi_heads.box_predictor.cls_score
+        cls_score.weight.zero_()
+        cls_score.bias.zero_()
+        cls_score.bias[0] = 6.0
+
+    torch.save({"model": model.state_dict()}, path)
+    return path
+
+
+def build_stub_models(out_dir, app_cfg, confidence=0.98, seed=0):
+    """
+    Gera classificador e detectores em `out_dir` e devolve uma cópia da
+    configuração da API apontando para eles (backend eager).
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    cfg = {**app_cfg}
+
+    classifier_path = os.path.join(out_dir, "species_classifier.pth")
+    build_stub_classifier(classifier_path, confidence, seed)
+    cfg["classifier"] = {**cfg.get("classifier", {}), "model": os.path.abspath(classifier_path), "backend": "eager"}
+
+    detectron = {}
+    for species in SPECIES:
+        paths = cfg.get("detectron", {}).get(species, {})
+        yaml_path = paths.get("config") or os.path.join("models/detectron", species, f"inferencia_{species}.yaml")
+        weights = os.path.join(out_dir, f"model_final_{species}.pth")
+        build_stub_detector(yaml_path, weights, seed)
+        detectron[species] = {"config": yaml_path, "weights": weights, "backend": "eager"}
+    cfg["detectron"] = detectron
+
+    cfg["weights"] = {"mmap": False}
+    return cfg
+
+
+def real_weights_present(app_cfg):
+    """
+    Todos os pesos configurados existem no disco?
+    """
+    paths = [app_cfg.get("classifier", {}).get("model", "")]
+    for species in SPECIES:
+        paths.append(
+            app_cfg.get("detectron", {}).get(species, {}).get("weights")
+            or os.path.join("models/detectron", species, f"model_final_{species}.pth")
+        )
+    return all(p and os.path.isfile(p) for p in paths)
@@ -0,0 +1,99 @@
+"""
+Converte os pesos eager para arquivos carregáveis via mmap
+(`torch.load(..., mmap=True)`), compartilhados entre workers.
+
+Detectron2: só o state_dict do modelo (sem optimizer/scheduler do checkpoint),
+com tensores contíguos, no formato zip do torch.save.
+Classificador: o módulo inteiro re-salvo no formato zip.
+
+Depois de converter, ative `weights.mmap: true` em configs/app.yaml.
+
+Uso:
+    python scripts/convert_weights_mmap.py --model all
+"""
+import argparse
+import os
+import sys
+
+import torch
+
+# `python scripts/convert_weights_mmap.py` de qualquer diretório: pacote app e configs/app.yaml da raiz do repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("APP_CONFIG", os.path.join(ROOT, "configs", "app.yaml"))
+
+from app.backends import mmap_path  # noqa: E402
+from app.classifier import SpeciesClassifier  # noqa: E402
+from app.config import CFG  # noqa: E402
+from app.detectron import build_cfg  # noqa: E402
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Converte pesos para carregamento via mmap"
+    )
+    parser.add_argument(
+        "--model",
+        default="all",
+        choices=["classifier", "canino", "felino", "all"],
+        help="Modelo a converter"
+    )
+    return parser.parse_args()
+
+
+def state_dict_mb(state_dict):
+    return sum(t.numel() * t.element_size() for t in state_dict.values()) / 2 ** 20
+
+
+# ======================
+# CLASSIFICADOR
+# ======================
+def convert_classifier():
+    model_path = CFG["classifier"]["model"]
+    clf = SpeciesClassifier(model_path, threshold=0.0)
+
+    path = mmap_path(model_path)
+    torch.save(clf.model, path)
+    print(f"✔ Classificador: {path} ({state_dict_mb(clf.model.state_dict()):.1f} MB)")
+
+
+# ======================
+# DETECTRON2
+# ======================
+def convert_detector(species):
+    from detectron2.checkpoint import DetectionCheckpointer
+    from detectron2.modeling import build_model
+
+    paths = CFG.get("detectron", {}).get(species, {})
+    cfg = build_cfg(species, paths.get("config"), paths.get("weights"))
+
+    # carrega pelo checkpointer para aplicar as mesmas conversões de chaves da API
+    model = build_model(cfg)
+    DetectionCheckpointer(model).load(cfg.MODEL.WEIGHTS)
+
+    state_dict = {k: v.detach().contiguous() for k, v in model.state_dict().items()}
+    path = mmap_path(cfg.MODEL.WEIGHTS)
+    torch.save(state_dict, path)
+    print(f"✔ Detectron2 {species}: {path} ({state_dict_mb(state_dict):.1f} MB)")
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+
+    if args.model in ("classifier", "all"):
+        convert_classifier()
+    for species in ("canino", "felino"):
+        if args.model in (species, "all"):
+            convert_detector(species)
+
+    print("\nAtive `weights.mmap: true` em configs/app.yaml para usar os pesos convertidos.")
+
+
+if __name__ == "__main__":
+    main()
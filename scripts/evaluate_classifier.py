@@ -11,6 +11,7 @@ from app.classifier import SpeciesClassifier
 DATASET_DIR = "dataset_figado/test"
 MODEL = "models/classifier/species_classifier.pth"
 DEVICE = "cpu"
+BATCH_SIZE = 64
 
 classifier = SpeciesClassifier(MODEL, threshold=0.0)
 
@@ -18,13 +19,19 @@ y_true = []
 y_pred = []
 
 for label in ["canino", "felino"]:
-    folder = os.path.join(DATASET, label)
-    for img_name in os.listdir(folder):
-        img = Image.open(os.path.join(folder, img_name)).convert("RGB")
-        pred, _ = classifier.predict(img)
-
-        y_true.append(label)
-        y_pred.append(pred if pred else "desconhecido")
+    folder = os.path.join(DATASET_DIR, label)
+    names = sorted(os.listdir(folder))
+
+    # ---- classifica em lotes (um forward por lote)
+    for i in range(0, len(names), BATCH_SIZE):
+        imgs = [
+            Image.open(os.path.join(folder, img_name)).convert("RGB")
+            for img_name in names[i:i + BATCH_SIZE]
+        ]
+
+        for pred, _ in classifier.predict_batch(imgs):
+            y_true.append(label)
+            y_pred.append(pred if pred else "desconhecido")
 
 report = classification_report(
     y_true,
@@ -1,12 +1,23 @@
 import argparse
 import os
+import sys
+import time
 
+import torch
 from detectron2.config import get_cfg
 from detectron2.engine import DefaultPredictor
 from detectron2.evaluation import COCOEvaluator, inference_on_dataset
 from detectron2.data import build_detection_test_loader, DatasetCatalog
 from detectron2.data.datasets import register_coco_instances
 
+# `python scripts/evaluate_detectron.py` de qualquer diretório: pacote app e configs/app.yaml da raiz do repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("APP_CONFIG", os.path.join(ROOT, "configs", "app.yaml"))
+
+from app.config import CFG  # noqa: E402
+from app.tiers import apply_tier_cfg, tier_model, tier_names  # noqa: E402
+
 
 # ======================
 # ARGUMENTOS CLI
@@ -27,75 +38,168 @@ def parse_args():
         choices=["train", "val", "test"],
         help="Split do dataset para avaliação"
     )
+    parser.add_argument(
+        "--tiers",
+        nargs="*",
+        default=None,
+        help="Avalia os tiers de configs/app.yaml (todos, se nenhum for informado): AP e latência"
+    )
     return parser.parse_args()
 
 
-# ======================
-# MAIN
-# ======================
-def main():
-    args = parse_args()
-
-    SPECIES = args.species
-    SPLIT = args.split
-
-    BASE_DATASET = "/home/daniela/Documentos/projeto RP treinamento/projeto RP/dataset_detectron"
-
-    DATASET_NAME = f"figado_{SPECIES}_{SPLIT}"
-    DATASET_IMG = f"{BASE_DATASET}/{SPECIES}/{SPLIT}/images"
-    DATASET_ANN = f"{BASE_DATASET}/{SPECIES}/{SPLIT}/annotations.json"
-
-    CONFIG_PATH = f"models/detectron/{SPECIES}/inferencia_{SPECIES}.yaml"
-    WEIGHTS_PATH = f"models/detectron/{SPECIES}/model_final_{SPECIES}.pth"
+BASE_DATASET = "/home/daniela/Documentos/projeto RP treinamento/projeto RP/dataset_detectron"
 
-    OUTPUT_DIR = f"results/eval/{SPECIES}/{SPLIT}"
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-    # ======================
-    # VALIDAÇÃO DE CAMINHOS
-    # ======================
-    for path in [DATASET_IMG, DATASET_ANN, CONFIG_PATH, WEIGHTS_PATH]:
+# ======================
+# DATASET / CONFIG / AVALIAÇÃO
+# (reutilizados por scripts/quantize_models.py)
+# ======================
+def register_dataset(species, split, base_dataset=BASE_DATASET):
+    """
+    Registra o split COCO da espécie e retorna o nome do dataset.
+    """
+    dataset_name = f"figado_{species}_{split}"
+    dataset_img = f"{base_dataset}/{species}/{split}/images"
+    dataset_ann = f"{base_dataset}/{species}/{split}/annotations.json"
+
+    for path in [dataset_img, dataset_ann]:
         if not os.path.exists(path):
             raise FileNotFoundError(f"❌ Caminho não encontrado: {path}")
 
-    # ======================
-    # REGISTRO DO DATASET
-    # ======================
-    if DATASET_NAME not in DatasetCatalog.list():
+    if dataset_name not in DatasetCatalog.list():
         register_coco_instances(
-            DATASET_NAME,
+            dataset_name,
             {},
-            DATASET_ANN,
-            DATASET_IMG
+            dataset_ann,
+            dataset_img
         )
+    return dataset_name
+
+
+def build_eval_cfg(species):
+    config_path = f"models/detectron/{species}/inferencia_{species}.yaml"
+    weights_path = f"models/detectron/{species}/model_final_{species}.pth"
+
+    for path in [config_path, weights_path]:
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"❌ Caminho não encontrado: {path}")
 
-    # ======================
-    # CONFIGURAÇÃO DO MODELO
-    # ======================
     cfg = get_cfg()
-    cfg.merge_from_file(CONFIG_PATH)
-    cfg.MODEL.WEIGHTS = WEIGHTS_PATH
+    cfg.merge_from_file(config_path)
+    cfg.MODEL.WEIGHTS = weights_path
     cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = 0.05
     cfg.MODEL.DEVICE = "cpu"
+    return cfg
+
+
+def evaluate_model(cfg, model, dataset_name, output_dir):
+    """
+    Avaliação COCO (AP, AP50, AP75...) de um modelo já carregado.
+    """
+    os.makedirs(output_dir, exist_ok=True)
 
-    # ======================
-    # AVALIAÇÃO
-    # ======================
     evaluator = COCOEvaluator(
-        DATASET_NAME,
+        dataset_name,
         cfg,
         False,
-        output_dir=OUTPUT_DIR
+        output_dir=output_dir
     )
 
-    loader = build_detection_test_loader(cfg, DATASET_NAME)
+    loader = build_detection_test_loader(cfg, dataset_name)
 
-    results = inference_on_dataset(
-        DefaultPredictor(cfg).model,
+    return inference_on_dataset(
+        model,
         loader,
         evaluator
     )
 
+
+class TimedModel(torch.nn.Module):
+    """
+    Mede o tempo de cada chamada ao modelo durante a avaliação.
+    """
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.seconds = []
+
+    def forward(self, inputs):
+        start = time.perf_counter()
+        outputs = self.model(inputs)
+        self.seconds.append(time.perf_counter() - start)
+        return outputs
+
+
+def evaluate_tiers(species, dataset_name, output_dir, tiers):
+    """
+    AP e latência de cada tier. O modelo é carregado uma vez; cada tier
+    é uma visão dele (ver app/tiers.py), como na API.
+    """
+    base_cfg = build_eval_cfg(species)
+    base_model = DefaultPredictor(base_cfg).model
+
+    report = {}
+    for tier in tiers:
+        cfg = apply_tier_cfg(base_cfg, tier)
+        # AP precisa das detecções de score baixo, como na avaliação base
+        if CFG["tiers"][tier].get("score_thresh") is None:
+            cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST = base_cfg.MODEL.ROI_HEADS.SCORE_THRESH_TEST
+
+        timed = TimedModel(tier_model(base_model, cfg))
+        results = evaluate_model(cfg, timed, dataset_name, os.path.join(output_dir, tier))
+
+        seconds = sorted(timed.seconds[1:] or timed.seconds)  # descarta o aquecimento
+        report[tier] = {
+            "input": f"{cfg.INPUT.MIN_SIZE_TEST}/{cfg.INPUT.MAX_SIZE_TEST}",
+            "AP": results.get("bbox", {}).get("AP"),
+            "AP50": results.get("bbox", {}).get("AP50"),
+            "latency_ms": 1000 * sum(seconds) / max(len(seconds), 1),
+            "p95_ms": 1000 * seconds[int(0.95 * (len(seconds) - 1))] if seconds else None
+        }
+    return report
+
+
+def print_tiers(report):
+    print(f"\n{'tier':<10} {'entrada':<10} {'AP':>7} {'AP50':>7} {'lat. ms':>9} {'p95 ms':>9}")
+    for tier, r in report.items():
+        ap = f"{r['AP']:.2f}" if r["AP"] is not None else "-"
+        ap50 = f"{r['AP50']:.2f}" if r["AP50"] is not None else "-"
+        p95 = f"{r['p95_ms']:.1f}" if r["p95_ms"] is not None else "-"
+        print(f"{tier:<10} {r['input']:<10} {ap:>7} {ap50:>7} {r['latency_ms']:>9.1f} {p95:>9}")
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+
+    SPECIES = args.species
+    SPLIT = args.split
+
+    OUTPUT_DIR = f"results/eval/{SPECIES}/{SPLIT}"
+
+    dataset_name = register_dataset(SPECIES, SPLIT)
+
+    if args.tiers is not None:
+        tiers = args.tiers or tier_names()
+        unknown = [t for t in tiers if t not in tier_names()]
+        if unknown:
+            raise SystemExit(f"❌ Tier(s) inexistente(s): {', '.join(unknown)}")
+
+        print_tiers(evaluate_tiers(SPECIES, dataset_name, OUTPUT_DIR, tiers))
+        return
+
+    cfg = build_eval_cfg(SPECIES)
+
+    results = evaluate_model(
+        cfg,
+        DefaultPredictor(cfg).model,
+        dataset_name,
+        OUTPUT_DIR
+    )
+
     print("\n✅ Avaliação concluída")
     print(f"Espécie: {SPECIES}")
     print(f"Split: {SPLIT}")
@@ -0,0 +1,200 @@
+"""
+Exporta os modelos da API para TorchScript e/ou ONNX
+e confere a paridade com o modelo eager.
+
+Uso:
+    python scripts/export_models.py --model all --backend torchscript onnx --check --images dataset_figado/test/canino
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+import torch
+
+# `python scripts/export_models.py` de qualquer diretório: pacote app e configs/app.yaml da raiz do repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("APP_CONFIG", os.path.join(ROOT, "configs", "app.yaml"))
+
+from app.backends import ExportedPredictor, exported_path  # noqa: E402
+from app.classifier import SpeciesClassifier  # noqa: E402
+from app.config import CFG  # noqa: E402
+from app.detectron import build_cfg, predict_batch  # noqa: E402
+from app.ingest import CHANNEL_ORDER, classifier_input  # noqa: E402
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Exporta classificador e Detectron2 para TorchScript/ONNX"
+    )
+    parser.add_argument(
+        "--model",
+        default="all",
+        choices=["classifier", "canino", "felino", "all"],
+        help="Modelo a exportar"
+    )
+    parser.add_argument(
+        "--backend",
+        nargs="+",
+        default=["torchscript", "onnx"],
+        choices=["torchscript", "onnx"],
+        help="Formatos de exportação"
+    )
+    parser.add_argument("--images", default=None, help="Pasta com imagens para tracing e paridade")
+    parser.add_argument("--num-images", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Compara saídas exportadas vs eager")
+    parser.add_argument("--atol-box", type=float, default=1.0, help="Tolerância das caixas (px)")
+    parser.add_argument("--atol-score", type=float, default=1e-3, help="Tolerância de scores/probabilidades")
+    parser.add_argument("--opset", type=int, default=16)
+    return parser.parse_args()
+
+
+def load_images(folder, n):
+    """
+    Imagens BGR de exemplo; sem pasta, gera imagens sintéticas.
+    """
+    images = []
+    if folder:
+        for name in sorted(os.listdir(folder)):
+            img = cv2.imread(os.path.join(folder, name))
+            if img is not None:
+                images.append(img)
+            if len(images) >= n:
+                break
+    if not images:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 256, (480, 640, 3), dtype=np.uint8) for _ in range(n)]
+    return images
+
+
+# ======================
+# CLASSIFICADOR
+# ======================
+def export_classifier(args, images):
+    model_path = CFG["classifier"]["model"]
+    eager = SpeciesClassifier(model_path, threshold=0.0)
+    dummy = torch.rand(1, 3, *eager.input_size)
+
+    for backend in args.backend:
+        path = exported_path(model_path, backend)
+
+        if backend == "torchscript":
+            torch.jit.trace(eager.model, dummy).save(path)
+        else:
+            torch.onnx.export(
+                eager.model,
+                dummy,
+                path,
+                input_names=["image"],
+                output_names=["logits"],
+                dynamic_axes={"image": {0: "batch"}, "logits": {0: "batch"}},
+                opset_version=args.opset
+            )
+        print(f"✔ Classificador exportado: {path}")
+
+    if not args.check:
+        return True
+
+    x = eager._to_batch([classifier_input(img) for img in images], CHANNEL_ORDER)
+    with torch.no_grad():
+        ref = torch.softmax(eager.model(x), dim=1)
+
+    ok = True
+    for backend in args.backend:
+        exported = SpeciesClassifier(model_path, threshold=0.0, backend=backend)
+        with torch.no_grad():
+            out = torch.softmax(exported.model(x), dim=1)
+        diff = (ref - out).abs().max().item()
+        passed = diff <= args.atol_score
+        ok &= passed
+        print(f"{'✅' if passed else '❌'} classificador/{backend}: max |Δprob| = {diff:.2e}")
+    return ok
+
+
+# ======================
+# DETECTRON2
+# ======================
+def export_detector(species, args, images):
+    from detectron2.engine import DefaultPredictor
+    from detectron2.export import TracingAdapter
+
+    paths = CFG.get("detectron", {}).get(species, {})
+    cfg = build_cfg(species, paths.get("config"), paths.get("weights"))
+    eager = DefaultPredictor(cfg)
+
+    # entrada já pré-processada, como o grafo exportado espera
+    sample = images[0]
+    resized = eager.aug.get_transform(sample).apply_image(sample)
+    image = torch.as_tensor(resized.astype("float32").transpose(2, 0, 1))
+
+    def inference(model, inputs):
+        instances = model.inference(inputs, do_postprocess=False)[0]
+        return [{"instances": instances}]
+
+    adapter = TracingAdapter(eager.model, [{"image": image}], inference)
+
+    for backend in args.backend:
+        path = exported_path(cfg.MODEL.WEIGHTS, backend)
+
+        with torch.no_grad():
+            if backend == "torchscript":
+                torch.jit.trace(adapter, (image,)).save(path)
+            else:
+                torch.onnx.export(adapter, (image,), path, opset_version=args.opset)
+        print(f"✔ Detectron2 {species} exportado: {path}")
+
+    if not args.check:
+        return True
+
+    ref = [out["instances"].to("cpu") for out in predict_batch(eager, images)]
+
+    ok = True
+    for backend in args.backend:
+        exported = ExportedPredictor(cfg, exported_path(cfg.MODEL.WEIGHTS, backend), backend)
+        outs = [out["instances"].to("cpu") for out in predict_batch(exported, images)]
+
+        max_box, max_score, passed = 0.0, 0.0, True
+        for r, o in zip(ref, outs):
+            if len(r) != len(o):
+                passed = False
+                continue
+            if len(r) == 0:
+                continue
+            max_box = max(max_box, (r.pred_boxes.tensor - o.pred_boxes.tensor).abs().max().item())
+            max_score = max(max_score, (r.scores - o.scores).abs().max().item())
+
+        passed &= max_box <= args.atol_box and max_score <= args.atol_score
+        ok &= passed
+        print(
+            f"{'✅' if passed else '❌'} {species}/{backend}: "
+            f"max |Δbox| = {max_box:.3f}px, max |Δscore| = {max_score:.2e}"
+        )
+    return ok
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+    images = load_images(args.images, args.num_images)
+
+    ok = True
+    if args.model in ("classifier", "all"):
+        ok &= export_classifier(args, images)
+    for species in ("canino", "felino"):
+        if args.model in (species, "all"):
+            ok &= export_detector(species, args, images)
+
+    if args.check:
+        print("\n✅ Paridade OK" if ok else "\n❌ Paridade fora da tolerância")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
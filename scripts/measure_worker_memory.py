@@ -0,0 +1,148 @@
+"""
+Mede a memória de cada worker da API separando o que é exclusivo do
+processo (Private_*) do que é compartilhado com os outros (Shared_*),
+a partir de /proc/<pid>/smaps_rollup (Linux).
+
+PSS divide cada página compartilhada entre os processos que a usam:
+a soma do PSS dos workers é o custo real no host.
+
+Uso:
+    python scripts/measure_worker_memory.py --parent <pid>     # filhos de um pai (serve_preload.py)
+    python scripts/measure_worker_memory.py --pids 1234 1235
+    python scripts/measure_worker_memory.py --match uvicorn --json memoria.json
+"""
+import argparse
+import json
+import os
+
+FIELDS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Memória única vs compartilhada por worker"
+    )
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--pids", type=int, nargs="+", help="PIDs dos workers")
+    group.add_argument("--parent", type=int, help="Mede os processos filhos deste PID")
+    group.add_argument("--match", help="Mede processos cuja linha de comando contém este texto")
+    parser.add_argument("--include-parent", action="store_true", help="Inclui o processo pai (--parent)")
+    parser.add_argument("--json", default=None, help="Salva o relatório em JSON")
+    return parser.parse_args()
+
+
+def smaps_rollup(pid):
+    """
+    Campos do /proc/<pid>/smaps_rollup, em bytes.
+    """
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            key = parts[0].rstrip(":")
+            if key in FIELDS:
+                values[key] = int(parts[1]) * 1024  # kB
+    return values
+
+
+def children_of(parent):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # o nome do processo (campo 2) pode conter espaços
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == parent:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def matching(text):
+    pids = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit() or int(entry) == os.getpid():
+            continue
+        try:
+            with open(f"/proc/{entry}/cmdline", "rb") as f:
+                cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+        except OSError:
+            continue
+        if text in cmdline:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def worker_report(pid):
+    m = smaps_rollup(pid)
+    return {
+        "pid": pid,
+        "rss": m.get("Rss", 0),
+        "pss": m.get("Pss", 0),
+        "unique": m.get("Private_Clean", 0) + m.get("Private_Dirty", 0),
+        "shared": m.get("Shared_Clean", 0) + m.get("Shared_Dirty", 0),
+    }
+
+
+def print_report(report):
+    mb = 2 ** 20
+    print(f"{'pid':>8}{'RSS MB':>12}{'único MB':>12}{'compart. MB':>14}{'PSS MB':>12}")
+    for w in report["workers"]:
+        print(
+            f"{w['pid']:>8}{w['rss'] / mb:>12.1f}{w['unique'] / mb:>12.1f}"
+            f"{w['shared'] / mb:>14.1f}{w['pss'] / mb:>12.1f}"
+        )
+    t = report["total"]
+    print(
+        f"{'total':>8}{t['rss'] / mb:>12.1f}{t['unique'] / mb:>12.1f}"
+        f"{t['shared'] / mb:>14.1f}{t['pss'] / mb:>12.1f}"
+    )
+    print(f"\nMemória real no host (soma do PSS): {t['pss'] / mb:.1f} MB")
+    print(f"Soma do RSS (contando o compartilhado N vezes): {t['rss'] / mb:.1f} MB")
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+
+    if args.pids:
+        pids = args.pids
+    elif args.parent:
+        pids = children_of(args.parent)
+        if args.include_parent:
+            pids = [args.parent] + pids
+    else:
+        pids = matching(args.match)
+
+    if not pids:
+        raise SystemExit("Nenhum processo encontrado")
+
+    workers = []
+    for pid in pids:
+        try:
+            workers.append(worker_report(pid))
+        except (FileNotFoundError, ProcessLookupError):
+            print(f"⚠️ Processo {pid} encerrado, ignorando")
+
+    report = {
+        "workers": workers,
+        "total": {k: sum(w[k] for w in workers) for k in ("rss", "pss", "unique", "shared")}
+    }
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"✔ Relatório: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+"""
+Quantização INT8 (dinâmica ou estática) dos modelos de CPU, com gate de acurácia.
+
+Roda a avaliação do modelo float e do quantizado lado a lado
+(AP COCO via scripts/evaluate_detectron.py para o Detectron2,
+acurácia para o classificador), além de latência e memória.
+O modelo INT8 só é aprovado para uso (backend "int8" em configs/app.yaml)
+se a queda de acurácia ficar dentro do limite.
+
+Uso:
+    python scripts/quantize_models.py --model canino --mode static --calib-images pasta/
+    python scripts/quantize_models.py --model classifier --mode dynamic
+"""
+import argparse
+import copy
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+# `python scripts/quantize_models.py` de qualquer diretório: pacote app e configs/app.yaml da raiz do repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("APP_CONFIG", os.path.join(ROOT, "configs", "app.yaml"))
+
+from app.backends import exported_path  # noqa: E402
+from app.classifier import SpeciesClassifier  # noqa: E402
+from app.config import CFG  # noqa: E402
+from app.detectron import predict_batch  # noqa: E402
+from app.ingest import CHANNEL_ORDER, classifier_input  # noqa: E402
+from app.quantization import (  # noqa: E402
+    quantize_classifier_dynamic,
+    quantize_classifier_static,
+    quantize_detector_dynamic,
+    quantize_detector_static,
+    report_path,
+    serialized_bytes,
+)
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Quantização INT8 com gate de acurácia"
+    )
+    parser.add_argument("--model", required=True, choices=["classifier", "canino", "felino"])
+    parser.add_argument("--mode", default="dynamic", choices=["dynamic", "static"])
+    parser.add_argument(
+        "--calib-images", default=None,
+        help="Pasta de imagens para calibração / latência (sem ela, a latência usa imagens sintéticas)"
+    )
+    parser.add_argument("--num-calib", type=int, default=32)
+    parser.add_argument("--split", default="val", choices=["train", "val", "test"])
+    parser.add_argument("--classifier-dataset", default="dataset_figado/test")
+    parser.add_argument("--max-ap-drop", type=float, default=1.0, help="Queda máxima de AP (pontos)")
+    parser.add_argument("--max-acc-drop", type=float, default=0.01, help="Queda máxima de acurácia")
+    return parser.parse_args()
+
+
+def load_images(folder, n):
+    if not folder:
+        return []
+    images = []
+    for name in sorted(os.listdir(folder)):
+        img = cv2.imread(os.path.join(folder, name))
+        if img is not None:
+            images.append(img)
+        if len(images) >= n:
+            break
+    return images
+
+
+def synthetic_images(n, height=800, width=1067, seed=0):
+    """
+    Imagens aleatórias só para medir latência (sem --calib-images).
+    """
+    rng = np.random.default_rng(seed)
+    return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(n)]
+
+
+def mean_latency_ms(fn, images, warmup=2):
+    if not images:
+        raise ValueError("Nenhuma imagem para medir a latência")
+    for img in images[:warmup]:
+        fn(img)
+    start = time.perf_counter()
+    for img in images:
+        fn(img)
+    return 1000 * (time.perf_counter() - start) / max(len(images), 1)
+
+
+def print_report(report):
+    print(f"\n📊 {report['model'].upper()} — INT8 {report['mode']}")
+    print(f"{'métrica':<20}{'float':>14}{'int8':>14}{'delta':>14}")
+    for key in report["float"]:
+        f, q, d = report["float"][key], report["int8"][key], report["delta"][key]
+        print(f"{key:<20}{f:>14.3f}{q:>14.3f}{d:>+14.3f}")
+    print("✅ Aprovado" if report["approved"] else "❌ Reprovado", f"(gate: {report['gate']})")
+
+
+# ======================
+# DETECTRON2
+# ======================
+def quantize_detector(args, calib, timing):
+    from detectron2.engine import DefaultPredictor
+    from scripts.evaluate_detectron import build_eval_cfg, evaluate_model, register_dataset
+
+    species = args.model
+    dataset_name = register_dataset(species, args.split)
+    cfg = build_eval_cfg(species)
+
+    predictor = DefaultPredictor(cfg)
+    quantized = copy.copy(predictor)
+    quantized.model = copy.deepcopy(predictor.model)
+
+    if args.mode == "dynamic":
+        quantize_detector_dynamic(quantized.model)
+    else:
+        if not calib:
+            raise ValueError("Quantização estática requer --calib-images")
+        quantize_detector_static(
+            quantized.model,
+            lambda: [predict_batch(quantized, [img]) for img in calib]
+        )
+
+    results = {}
+    for name, p in (("float", predictor), ("int8", quantized)):
+        ap = evaluate_model(cfg, p.model, dataset_name, f"results/quant/{species}/{name}")["bbox"]
+        results[name] = {
+            "AP": ap["AP"],
+            "AP50": ap["AP50"],
+            "latency_ms": mean_latency_ms(lambda img: predict_batch(p, [img]), timing),
+            "model_mb": serialized_bytes(p.model) / 2 ** 20
+        }
+
+    ap_drop = results["float"]["AP"] - results["int8"]["AP"]
+    out_path = exported_path(cfg.MODEL.WEIGHTS, "int8")
+    return quantized.model, out_path, results, ap_drop <= args.max_ap_drop, f"queda de AP <= {args.max_ap_drop}"
+
+
+# ======================
+# CLASSIFICADOR
+# ======================
+def classifier_accuracy(clf, dataset_dir, batch_size=64):
+    correct, total = 0, 0
+    for label in ["canino", "felino"]:
+        folder = os.path.join(dataset_dir, label)
+        names = sorted(os.listdir(folder))
+        for i in range(0, len(names), batch_size):
+            imgs = [cv2.imread(os.path.join(folder, n)) for n in names[i:i + batch_size]]
+            imgs = [img for img in imgs if img is not None]
+            preds = clf.predict_batch([classifier_input(img) for img in imgs], CHANNEL_ORDER)
+            correct += sum(pred == label for pred, _ in preds)
+            total += len(preds)
+    return correct / max(total, 1)
+
+
+def quantize_classifier(args, calib, timing):
+    model_path = CFG["classifier"]["model"]
+    eager = SpeciesClassifier(model_path, threshold=0.0)
+    quantized = copy.copy(eager)
+
+    if args.mode == "dynamic":
+        quantized.model = quantize_classifier_dynamic(copy.deepcopy(eager.model))
+    else:
+        if not calib:
+            raise ValueError("Quantização estática requer --calib-images")
+        batches = [
+            eager._to_batch([classifier_input(img) for img in calib[i:i + 8]], CHANNEL_ORDER)
+            for i in range(0, len(calib), 8)
+        ]
+        quantized.model = quantize_classifier_static(copy.deepcopy(eager.model), batches)
+
+    results = {}
+    for name, clf in (("float", eager), ("int8", quantized)):
+        results[name] = {
+            "accuracy": classifier_accuracy(clf, args.classifier_dataset),
+            "latency_ms": mean_latency_ms(
+                lambda img: clf.predict(classifier_input(img), channel_order=CHANNEL_ORDER), timing
+            ),
+            "model_mb": serialized_bytes(clf.model) / 2 ** 20
+        }
+
+    acc_drop = results["float"]["accuracy"] - results["int8"]["accuracy"]
+    out_path = exported_path(model_path, "int8")
+    return quantized.model, out_path, results, acc_drop <= args.max_acc_drop, f"queda de acurácia <= {args.max_acc_drop}"
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+    calib = load_images(args.calib_images, args.num_calib)
+
+    # latência sempre medida em imagens reais ou sintéticas (nunca numa lista vazia)
+    timing = calib
+    if not timing:
+        print("⚠️  Sem --calib-images: latência medida em imagens sintéticas")
+        timing = synthetic_images(min(args.num_calib, 8))
+
+    if args.model == "classifier":
+        model, out_path, results, approved, gate = quantize_classifier(args, calib, timing)
+    else:
+        model, out_path, results, approved, gate = quantize_detector(args, calib, timing)
+
+    torch.save(model, out_path)
+
+    report = {
+        "model": args.model,
+        "mode": args.mode,
+        "float": results["float"],
+        "int8": results["int8"],
+        "delta": {k: results["int8"][k] - results["float"][k] for k in results["float"]},
+        "gate": gate,
+        "approved": bool(approved)
+    }
+    with open(report_path(out_path), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+
+    print_report(report)
+    print(f"\n✔ Modelo salvo em: {out_path}")
+    print(f"✔ Relatório: {report_path(out_path)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Sobe a API com N workers criados por fork *depois* de carregar os modelos
+(preload-then-fork), para que os pesos fiquem compartilhados entre os
+workers (copy-on-write; com `weights.mmap: true`, também via page cache).
+
+O `uvicorn --workers N` cria cada worker do zero e carrega os modelos N vezes.
+Aqui o processo pai importa `app.main` (que carrega os modelos), abre o
+socket e faz fork; cada filho roda um servidor uvicorn no socket herdado.
+
+Uso:
+    python scripts/serve_preload.py --workers 4 --port 8000
+    python scripts/measure_worker_memory.py --parent <pid do pai>
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+
+import uvicorn
+
+# `python scripts/serve_preload.py` de qualquer diretório: pacote app e configs/app.yaml da raiz do repo
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("APP_CONFIG", os.path.join(ROOT, "configs", "app.yaml"))
+
+
+# ======================
+# ARGUMENTOS CLI
+# ======================
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="API com workers preload-then-fork"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--log-level", default="info")
+    return parser.parse_args()
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock, log_level):
+    config = uvicorn.Config(app, log_level=log_level)
+    server = uvicorn.Server(config)
+    server.run(sockets=[sock])
+
+
+# ======================
+# MAIN
+# ======================
+def main():
+    args = parse_args()
+
+    # ----------------------
+    # 1. Carrega os modelos no pai (antes do fork)
+    # ----------------------
+    # Nenhuma inferência roda aqui: executor, batcher e threads de log
+    # são criados sob demanda, já dentro de cada worker.
+    from app.main import app
+
+    sock = bind_socket(args.host, args.port)
+    print(f"✔ Modelos carregados (pid {os.getpid()}); iniciando {args.workers} workers")
+
+    # ----------------------
+    # 2. Fork dos workers
+    # ----------------------
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            run_worker(app, sock, args.log_level)
+            os._exit(0)
+        children.append(pid)
+
+    # ----------------------
+    # 3. Encaminha SIGINT/SIGTERM e espera os workers
+    # ----------------------
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    status = 0
+    for pid in children:
+        _, code = os.waitpid(pid, 0)
+        status = status or os.waitstatus_to_exitcode(code)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# Testes rodam a partir de qualquer diretório: raiz do repositório no
+# path e configuração padrão da API
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("APP_CONFIG", os.path.join(ROOT, "configs", "app.yaml"))
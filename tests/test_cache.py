@@ -0,0 +1,120 @@
+import asyncio
+import json
+
+from app.cache import ResultCache
+
+
+def size_of(value):
+    return len(json.dumps(value, ensure_ascii=False))
+
+
+def test_make_key_depends_on_bytes_and_parts():
+    key = ResultCache.make_key(b"img", "predict", 0.7)
+    assert key == ResultCache.make_key(b"img", "predict", 0.7)
+    assert key != ResultCache.make_key(b"img2", "predict", 0.7)
+    assert key != ResultCache.make_key(b"img", "predict", 0.8)
+    # separador entre as partes: ("ab", "c") != ("a", "bc")
+    assert ResultCache.make_key(b"", "ab", "c") != ResultCache.make_key(b"", "a", "bc")
+
+
+def test_lru_evicts_least_recently_used_by_bytes():
+    value = {"status": "ok"}
+    cache = ResultCache(max_bytes=2 * size_of(value))
+
+    async def scenario():
+        await cache.put("a", value)
+        await cache.put("b", value)
+        # "a" passa a ser o mais recente; "b" sai quando "c" entra
+        assert await cache.get("a") == value
+        await cache.put("c", value)
+        return [await cache.get(key) for key in ("a", "b", "c")]
+
+    assert asyncio.run(scenario()) == [value, None, value]
+    assert cache.stats()["bytes"] == 2 * size_of(value)
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_oversized_result_is_not_cached():
+    cache = ResultCache(max_bytes=10)
+
+    async def scenario():
+        await cache.put("a", {"x": "y" * 100})
+        return await cache.get("a")
+
+    assert asyncio.run(scenario()) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_level_survives_a_new_instance(tmp_path):
+    value = {"status": "ok", "deteccoes": []}
+    asyncio.run(ResultCache(disk_dir=str(tmp_path)).put("k" * 64, value))
+    assert asyncio.run(ResultCache(disk_dir=str(tmp_path)).get("k" * 64)) == value
+
+
+def test_get_or_compute_single_flight():
+    cache = ResultCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"status": "ok"}
+
+    async def scenario():
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+        again = await cache.get_or_compute("k", compute)
+        return results, again
+
+    results, again = asyncio.run(scenario())
+    assert calls == 1
+    assert results == [{"status": "ok"}] * 5
+    assert again == {"status": "ok"}
+    assert cache.shared == 4
+    assert cache.hits == 1
+
+
+def test_get_or_compute_failure_is_shared_and_not_cached():
+    cache = ResultCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise RuntimeError("falhou")
+
+    async def scenario():
+        results = await asyncio.gather(
+            *(cache.get_or_compute("k", compute) for _ in range(3)), return_exceptions=True
+        )
+        return results, await cache.get("k")
+
+    results, cached = asyncio.run(scenario())
+    assert calls == 1
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cached is None
+
+
+def test_get_or_compute_survives_leader_cancellation():
+    cache = ResultCache()
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"status": "ok"}
+
+    async def scenario():
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        waiter = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        return await waiter, leader.cancelled()
+
+    result, leader_cancelled = asyncio.run(scenario())
+    assert leader_cancelled
+    assert result == {"status": "ok"}
+    assert calls == 1
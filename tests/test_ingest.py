@@ -0,0 +1,56 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+pytest.importorskip("torch")
+
+import io  # noqa: E402
+
+from PIL import Image  # noqa: E402
+
+from app.ingest import classifier_input, decode_image  # noqa: E402
+
+
+def encode(image, ext=".jpg"):
+    ok, buf = cv2.imencode(ext, image)
+    assert ok
+    return buf.tobytes()
+
+
+# ======================
+# decode_image / classifier_input
+# ======================
+def test_decode_image_is_contiguous_bgr():
+    image = np.zeros((40, 60, 3), dtype=np.uint8)
+    image[..., 0] = 255  # azul em BGR
+
+    decoded = decode_image(encode(image, ".png"))
+    assert decoded.dtype == np.uint8
+    assert decoded.shape == (40, 60, 3)
+    assert decoded.flags["C_CONTIGUOUS"]
+    assert (decoded[..., 0] == 255).all() and (decoded[..., 2] == 0).all()
+
+
+def test_decode_image_ignores_exif_orientation():
+    # como o pipeline original (PIL), a imagem fica no referencial dos pixels armazenados
+    exif = Image.Exif()
+    exif[0x0112] = 6  # rotação de 90 graus
+    buf = io.BytesIO()
+    Image.new("RGB", (60, 40)).save(buf, "JPEG", exif=exif)
+
+    assert decode_image(buf.getvalue()).shape == (40, 60, 3)
+
+
+def test_classifier_input_is_a_view():
+    image = np.zeros((40, 60, 3), dtype=np.uint8)
+    view = classifier_input(image)
+    assert tuple(view.shape) == (3, 40, 60)
+
+    image[5, 7, 2] = 200
+    assert int(view[2, 5, 7]) == 200
+
+
+def test_decode_image_invalid_bytes():
+    with pytest.raises(ValueError):
+        decode_image(b"nao e uma imagem")
@@ -0,0 +1,25 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from app.outputs import render  # noqa: E402
+
+
+def test_render_thumbnail_uses_reduced_decode_and_scales_boxes():
+    image = np.zeros((2400, 3200, 3), dtype=np.uint8)
+    ok, buf = cv2.imencode(".jpg", image)
+    assert ok
+    detections = [{"classe": "figado_cao", "score": 0.9, "bbox": [800, 600, 2400, 1800]}]
+
+    body = render(buf.tobytes(), detections, max_size=800)
+    out = cv2.imdecode(np.frombuffer(body, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+    # JPEG decodificado em 1/4 (800 px no lado maior), caixa em 1/4 das coordenadas
+    assert out.shape == (600, 800, 3)
+    left_edge = out[300, 198:203]
+    assert left_edge[:, 1].max() > 150 and left_edge[:, 2].max() < 100
+    assert out[300, 400, 1] < 50  # interior da caixa continua preto
@@ -0,0 +1,84 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+pytest.importorskip("PIL")
+pytest.importorskip("torch")
+
+from app.ingest import decode_for_inference, reduction_factor  # noqa: E402
+
+
+def encode(image, ext=".jpg"):
+    ok, buf = cv2.imencode(ext, image)
+    assert ok
+    return buf.tobytes()
+
+
+# ======================
+# reduction_factor
+# ======================
+@pytest.mark.parametrize("width, height, expected", [
+    (1000, 800, 1),     # já no tamanho do Detectron2
+    (1333, 800, 1),
+    (3200, 2400, 2),    # lado menor 2400 -> 1200 >= 800
+    (4000, 3000, 2),    # 4x daria 750 < 800
+    (8000, 6000, 4),
+    (16000, 12000, 8),  # limitado ao maior fator do libjpeg
+])
+def test_reduction_factor(width, height, expected):
+    assert reduction_factor(width, height, 800, 1333) == expected
+
+
+def test_reduction_factor_keeps_detectron_size():
+    for width, height in [(3200, 2400), (6000, 1000), (1000, 6000), (5000, 5000)]:
+        factor = reduction_factor(width, height, 800, 1333)
+        scale = min(800 / min(width, height), 1333 / max(width, height))
+        assert factor * scale <= 1
+        assert factor == 8 or 2 * factor * scale > 1
+
+
+def test_reduction_factor_unbounded_for_tiles():
+    assert reduction_factor(8000, 6000, float("inf"), float("inf")) == 1
+
+
+# ======================
+# decode_for_inference
+# ======================
+def test_reduced_decode_boxes_scale_back_to_original():
+    image = np.zeros((2400, 3200, 3), dtype=np.uint8)
+    box = (640, 480, 1920, 1440)  # x0, y0, x1, y1
+    image[box[1]:box[3], box[0]:box[2]] = 255
+
+    decoded, (sx, sy) = decode_for_inference(encode(image), 800, 1333)
+    assert decoded.shape == (1200, 1600, 3)
+    assert (sx, sy) == (2.0, 2.0)
+
+    # caixa detectada no buffer reduzido, de volta às coordenadas originais
+    ys, xs = np.nonzero(decoded[..., 0] > 127)
+    found = (xs.min() * sx, ys.min() * sy, (xs.max() + 1) * sx, (ys.max() + 1) * sy)
+    assert found == pytest.approx(box, abs=2 * sx)
+
+
+def test_small_or_non_jpeg_decodes_at_full_resolution():
+    image = np.full((600, 900, 3), 128, dtype=np.uint8)
+    for ext in (".jpg", ".png"):
+        decoded, scale = decode_for_inference(encode(image, ext), 800, 1333)
+        assert decoded.shape == image.shape
+        assert scale == (1.0, 1.0)
+
+
+def test_max_pixels_reduces_jpeg_and_rejects_other_formats():
+    image = np.zeros((2400, 3200, 3), dtype=np.uint8)
+    inf = float("inf")
+
+    decoded, scale = decode_for_inference(encode(image), inf, inf, max_pixels=1_000_000)
+    assert decoded.shape[0] * decoded.shape[1] <= 1_000_000
+    assert scale == (4.0, 4.0)
+
+    with pytest.raises(ValueError, match="grande demais"):
+        decode_for_inference(encode(image, ".png"), inf, inf, max_pixels=1_000_000)
+
+
+def test_invalid_bytes():
+    with pytest.raises(ValueError):
+        decode_for_inference(b"nao e uma imagem")
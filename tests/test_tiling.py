@@ -0,0 +1,105 @@
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("cv2")
+pytest.importorskip("detectron2")
+
+from app.tiling import merge_detections, tile_grid  # noqa: E402
+
+
+# ======================
+# tile_grid
+# ======================
+@pytest.mark.parametrize("height, width", [(800, 800), (801, 1000), (2400, 3200), (3001, 4097)])
+def test_tile_grid_covers_image(height, width):
+    windows = tile_grid(height, width, 800, 0.2)
+
+    covered = torch.zeros(height, width, dtype=torch.bool)
+    for x0, y0, x1, y1 in windows:
+        assert 0 <= x0 < x1 <= width and 0 <= y0 < y1 <= height
+        assert x1 - x0 <= 800 and y1 - y0 <= 800
+        covered[y0:y1, x0:x1] = True
+    assert covered.all()
+
+
+def test_tile_grid_last_window_touches_border():
+    windows = tile_grid(2400, 3200, 800, 0.2)
+    assert max(x1 for _, _, x1, _ in windows) == 3200
+    assert max(y1 for _, _, _, y1 in windows) == 2400
+    # todas as janelas têm o tamanho cheio quando a imagem é maior que o tile
+    assert all((x1 - x0, y1 - y0) == (800, 800) for x0, y0, x1, y1 in windows)
+
+
+def test_tile_grid_overlap_between_neighbours():
+    xs = sorted({x0 for x0, _, _, _ in tile_grid(800, 3200, 800, 0.25)})
+    assert xs[0] == 0
+    assert all(b - a <= 600 for a, b in zip(xs, xs[1:]))
+
+
+def test_tile_grid_image_smaller_than_tile():
+    assert tile_grid(300, 500, 800, 0.2) == [(0, 0, 500, 300)]
+
+
+# ======================
+# merge_detections
+# ======================
+def detections(boxes, scores, classes):
+    return (
+        torch.tensor(boxes, dtype=torch.float32),
+        torch.tensor(scores, dtype=torch.float32),
+        torch.tensor(classes, dtype=torch.int64),
+    )
+
+
+def test_nms_keeps_highest_score():
+    boxes, scores, classes = detections(
+        [[0, 0, 100, 100], [10, 0, 110, 100]], [0.6, 0.9], [0, 0]
+    )
+    out_boxes, out_scores, out_classes = merge_detections(boxes, scores, classes, mode="nms", metric="iou")
+    assert out_boxes.tolist() == [[10, 0, 110, 100]]
+    assert out_scores.tolist() == pytest.approx([0.9])
+    assert out_classes.tolist() == [0]
+
+
+def test_wbf_averages_boxes_by_score():
+    boxes, scores, classes = detections(
+        [[0, 0, 100, 100], [10, 0, 110, 100]], [0.25, 0.75], [0, 0]
+    )
+    out_boxes, out_scores, _ = merge_detections(boxes, scores, classes, mode="wbf", metric="iou")
+    assert out_boxes.tolist() == [pytest.approx([7.5, 0, 107.5, 100])]
+    assert out_scores.tolist() == pytest.approx([0.75])
+
+
+def test_different_classes_are_not_merged():
+    boxes, scores, classes = detections(
+        [[0, 0, 100, 100], [0, 0, 100, 100]], [0.9, 0.8], [0, 1]
+    )
+    out_boxes, _, out_classes = merge_detections(boxes, scores, classes, mode="nms")
+    assert len(out_boxes) == 2
+    assert sorted(out_classes.tolist()) == [0, 1]
+
+
+def test_ios_merges_cut_object_that_iou_keeps():
+    # parte de um objeto cortada pela borda do tile, dentro da detecção completa
+    boxes, scores, classes = detections(
+        [[0, 0, 400, 400], [0, 0, 100, 400]], [0.9, 0.8], [0, 0]
+    )
+    assert len(merge_detections(boxes, scores, classes, mode="nms", metric="iou")[0]) == 2
+    assert len(merge_detections(boxes, scores, classes, mode="nms", metric="ios")[0]) == 1
+
+
+def test_merge_respects_max_detections_and_order():
+    boxes, scores, classes = detections(
+        [[0, 0, 10, 10], [100, 0, 110, 10], [200, 0, 210, 10]], [0.5, 0.9, 0.7], [0, 0, 0]
+    )
+    _, out_scores, _ = merge_detections(boxes, scores, classes, max_detections=2)
+    assert out_scores.tolist() == pytest.approx([0.9, 0.7])
+
+
+def test_merge_empty_and_invalid_mode():
+    boxes, scores, classes = detections([], [], [])
+    out_boxes, out_scores, out_classes = merge_detections(boxes.reshape(0, 4), scores, classes)
+    assert len(out_boxes) == len(out_scores) == len(out_classes) == 0
+
+    with pytest.raises(ValueError):
+        merge_detections(boxes.reshape(0, 4), scores, classes, mode="soft")